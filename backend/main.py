@@ -1,24 +1,36 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, UploadFile, File, HTTPException, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
 import aiofiles
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
 import os
 from pathlib import Path
+from urllib.parse import quote
 import uuid
 from datetime import datetime
-import io
+import hashlib
 import csv
-import json
+import orjson
+import pandas as pd
+import re
+import logging
 from typing import List, Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, TypeAdapter, ValidationError
 
 from services.llm_processor import DualLLMProcessor
-from services.database import DatabaseService
+from services.database import DatabaseService, CSV_BASIC_COLUMNS, build_csv_columns
 from services.learning_service import LearningService
 from models.transaction import TransactionData
 from routers import learning
+from utils.logging_config import setup_logging
 
-app = FastAPI(title="Siwake Bank Data Reader", version="1.0.0")
+# ログ出力はQueueListenerのスレッドで行い、リクエスト処理ではキューへの投入のみ
+log_listener = setup_logging()
+logger = logging.getLogger("upload")
+
+app = FastAPI(title="Siwake Bank Data Reader", version="1.0.0", default_response_class=ORJSONResponse)
 
 # CORS設定 - Railway本番環境と開発環境の両方をサポート
 app.add_middleware(
@@ -33,11 +45,21 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 1KB以上のレスポンスはgzip圧縮
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
 # サービス初期化
 llm_processor = DualLLMProcessor()
 db_service = DatabaseService()
 learning_service = None  # startup時に初期化
 
+# ファイル名から銀行名を検出するためのパターン（起動時に一度だけコンパイル）
+KNOWN_BANKS = ['GMOあおぞら', '三菱UFJ', 'みずほ', '楽天', 'ゆうちょ']
+BANK_NAME_PATTERN = re.compile('|'.join(map(re.escape, KNOWN_BANKS)))
+
+# アップロードをディスクへストリーム書き込みする際のチャンクサイズ
+UPLOAD_CHUNK_SIZE = 16 * 1024 * 1024  # 16MB
+
 class ProcessingResult(BaseModel):
     id: str
     filename: str
@@ -50,43 +72,103 @@ class ProcessingResult(BaseModel):
 async def startup_event():
     global learning_service
     try:
-        print("Initializing database service...")
+        logger.info("Initializing database service...")
         await db_service.initialize()
-        print("Database service initialized successfully")
+        logger.info("Database service initialized successfully")
         
-        print("Initializing learning service...")
+        logger.info("Initializing learning service...")
         learning_service = LearningService(db_service.pool)
-        print("Learning service initialized successfully")
+        logger.info("Learning service initialized successfully")
+        
+        # PDFラスタライズ等のCPU処理はプロセスプールで実行し、イベントループを塞がない
+        app.state.ppe = ProcessPoolExecutor(max_workers=os.cpu_count())
+        llm_processor.process_pool = app.state.ppe
+        
+        # ルーターから共有できるようにアプリケーション状態へ登録
+        app.state.db_service = db_service
+        app.state.learning_service = learning_service
         
         os.makedirs("uploads", exist_ok=True)
-        print("Uploads directory created/verified")
-        print("Application startup completed successfully")
+        logger.info("Uploads directory created/verified")
+        logger.info("Application startup completed successfully")
         
     except Exception as e:
-        print(f"Startup error: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Startup error: %s", e)
         raise e
     
+@app.on_event("shutdown")
+async def shutdown_event():
+    ppe = getattr(app.state, "ppe", None)
+    if ppe:
+        ppe.shutdown(wait=False, cancel_futures=True)
+    # プールを閉じる前に未反映の辞書使用回数を書き込む
+    if learning_service:
+        await learning_service.close()
+    await db_service.close()
+    await llm_processor.close()
+    log_listener.stop()
+    
 # 学習ルーターを追加
 app.include_router(learning.router)
 
 # WebSocket接続を管理
 class ConnectionManager:
+    # 連続した進捗メッセージを1回の送信にまとめる際の上限件数と待ち時間
+    BATCH_MAX_MESSAGES = 50
+    BATCH_WAIT_SECONDS = 0.02
+
     def __init__(self):
         self.active_connections: dict[str, WebSocket] = {}
+        self._queues: dict[str, asyncio.Queue] = {}
+        self._drain_tasks: dict[str, asyncio.Task] = {}
 
     async def connect(self, websocket: WebSocket, client_id: str):
         await websocket.accept()
         self.active_connections[client_id] = websocket
+        self._queues[client_id] = asyncio.Queue()
+        self._drain_tasks[client_id] = asyncio.create_task(self._drain(client_id))
 
     def disconnect(self, client_id: str):
-        if client_id in self.active_connections:
-            del self.active_connections[client_id]
+        self.active_connections.pop(client_id, None)
+        self._queues.pop(client_id, None)
+        task = self._drain_tasks.pop(client_id, None)
+        if task:
+            task.cancel()
 
     async def send_message(self, message: str, client_id: str):
-        if client_id in self.active_connections:
-            await self.active_connections[client_id].send_text(message)
+        """JSONメッセージを送信キューに積む（送信自体は_drainが行う）"""
+        queue = self._queues.get(client_id)
+        if queue is not None:
+            queue.put_nowait(message)
+
+    async def _drain(self, client_id: str):
+        """キューに溜まったメッセージをまとめて送信"""
+        queue = self._queues[client_id]
+        websocket = self.active_connections[client_id]
+        try:
+            while True:
+                batch = [await queue.get()]
+                
+                # 後続メッセージが既に積まれている場合のみ、短時間待ってまとめる
+                if not queue.empty():
+                    while len(batch) < self.BATCH_MAX_MESSAGES:
+                        try:
+                            batch.append(await asyncio.wait_for(queue.get(), timeout=self.BATCH_WAIT_SECONDS))
+                        except asyncio.TimeoutError:
+                            break
+                
+                if len(batch) == 1:
+                    await websocket.send_text(batch[0])
+                else:
+                    # 複数メッセージはJSON配列として1回で送信
+                    await websocket.send_text(f"[{','.join(batch)}]")
+                
+                # 他のタスクに制御を譲る
+                await asyncio.sleep(0)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.warning("WebSocket send error for %s: %s", client_id, e)
 
 manager = ConnectionManager()
 
@@ -126,13 +208,13 @@ async def websocket_endpoint(websocket: WebSocket, client_id: str):
         while True:
             # Keep connection alive
             data = await websocket.receive_text()
-            await manager.send_message(f"Echo: {data}", client_id)
+            await websocket.send_text(f"Echo: {data}")
     except WebSocketDisconnect:
         manager.disconnect(client_id)
 
 @app.post("/upload", response_model=ProcessingResult)
 async def upload_file(file: UploadFile = File(...), client_id: str = None):
-    print(f"Upload request received: {file.filename}, content_type: {file.content_type}, client_id: {client_id}")
+    logger.info("Upload request received: %s, content_type: %s, client_id: %s", file.filename, file.content_type, client_id)
     
     if not file.content_type.startswith(('image/', 'application/pdf')):
         raise HTTPException(status_code=400, detail="Invalid file type")
@@ -140,7 +222,7 @@ async def upload_file(file: UploadFile = File(...), client_id: str = None):
     # ファイル保存
     file_id = str(uuid.uuid4())
     file_path = f"uploads/{file_id}_{file.filename}"
-    print(f"Saving file to: {file_path}")
+    logger.debug("Saving file to: %s", file_path)
     
     # 進捗通知
     async def send_progress(message: str, progress: int = None):
@@ -152,68 +234,62 @@ async def upload_file(file: UploadFile = File(...), client_id: str = None):
             }
             if progress is not None:
                 progress_data["progress"] = progress
-            await manager.send_message(json.dumps(progress_data), client_id)
+            await manager.send_message(orjson.dumps(progress_data).decode(), client_id)
     
     await send_progress("Uploading file...")
     
+    # ファイル全体をメモリに載せず、チャンク単位でディスクへ書き込む
+    file_size = 0
+    file_hash = hashlib.sha256()
     async with aiofiles.open(file_path, 'wb') as f:
-        content = await file.read()
-        await f.write(content)
-        print(f"File saved. Size: {len(content)} bytes")
+        # サイズが分かっている場合は領域を事前確保して断片化と逐次拡張を避ける
+        if file.size and hasattr(os, 'posix_fallocate'):
+            try:
+                os.posix_fallocate(f.fileno(), 0, file.size)
+            except OSError:
+                pass
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            file_hash.update(chunk)
+            await f.write(chunk)
+            file_size += len(chunk)
+        if file.size and file_size != file.size:
+            await f.truncate(file_size)
+    # SHA-256はOpenSSL実装（SHA-NI対応CPUではハードウェア命令）で書き込みと並行して計算
+    file_digest = file_hash.hexdigest()
+    logger.debug("File saved. Size: %d bytes, SHA-256: %s", file_size, file_digest)
     
     await send_progress("File uploaded successfully. Starting processing...")
     
     try:
         # LLM処理
-        print("Starting LLM processing...")
+        logger.debug("Starting LLM processing...")
         start_time = datetime.now()
-        result = await llm_processor.process_document(content, send_progress)
+        result = await llm_processor.process_document(file_path, send_progress)
         
         # 学習済みパターンを適用して自動修正
         if learning_service and result.transactions:
             await send_progress("Applying learned patterns for auto-correction...")
             # 銀行名を検出（ファイル名から推定）
-            bank_name = None
-            for bank in ['GMOあおぞら', '三菱UFJ', 'みずほ', '楽天', 'ゆうちょ']:
-                if bank in file.filename:
-                    bank_name = bank
-                    break
-            
-            # トランザクションをDict形式に変換
-            transactions_dict = [
-                {
-                    'date': t.date,
-                    'description': t.description,
-                    'withdrawal': t.withdrawal,
-                    'deposit': t.deposit,
-                    'balance': t.balance,
-                    'confidence_score': t.confidence_score
-                }
-                for t in result.transactions
-            ]
+            bank_match = BANK_NAME_PATTERN.search(file.filename)
+            bank_name = bank_match.group(0) if bank_match else None
             
-            # 学習パターンを適用
-            corrected_transactions = await learning_service.apply_learned_corrections(
-                transactions_dict, bank_name
+            # 学習パターンをTransactionDataへ直接適用
+            await learning_service.apply_learned_corrections_models(
+                result.transactions, bank_name
             )
-            
-            # TransactionDataに戻す
-            result.transactions = [
-                TransactionData(**t) for t in corrected_transactions
-            ]
-            print(f"Applied learning corrections for bank: {bank_name}")
+            logger.debug("Applied learning corrections for bank: %s", bank_name)
         
         processing_time = (datetime.now() - start_time).total_seconds()
-        print(f"LLM processing completed in {processing_time:.2f}s")
-        print(f"Result: {len(result.transactions)} transactions, confidence: {result.confidence_score}")
+        logger.info("LLM processing completed in %.2fs", processing_time)
+        logger.info("Result: %d transactions, confidence: %s", len(result.transactions), result.confidence_score)
         
         await send_progress(f"Processing completed! Found {len(result.transactions)} transactions.")
         
         # DB保存
         await db_service.save_processing_result(
-            file_id, file.filename, result, processing_time
+            file_id, file.filename, result, processing_time, file_hash=file_digest
         )
-        print("Result saved to database")
+        logger.debug("Result saved to database")
         
         response_data = ProcessingResult(
             id=file_id,
@@ -223,13 +299,11 @@ async def upload_file(file: UploadFile = File(...), client_id: str = None):
             confidence_score=result.confidence_score,
             processing_time=processing_time
         )
-        print(f"Returning response with {len(response_data.transactions)} transactions")
+        logger.debug("Returning response with %d transactions", len(response_data.transactions))
         return response_data
     
     except Exception as e:
-        print(f"Upload error: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Upload error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/results/{file_id}")
@@ -239,106 +313,135 @@ async def get_result(file_id: str):
         raise HTTPException(status_code=404, detail="Result not found")
     return result
 
+@app.get("/history/stats")
+async def get_history_stats():
+    """ダッシュボード用に全履歴の集計値を取得"""
+    try:
+        return await db_service.get_history_stats()
+    except Exception as e:
+        logger.error("History stats fetch error: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/history")
-async def get_all_history():
-    """全ての処理済みファイルの履歴を取得"""
+async def get_all_history(cursor: Optional[str] = None, limit: int = 50):
+    """処理済みファイルの履歴を新しい順にページ単位で取得
+    
+    cursorには前ページのレスポンスのnext_cursorを指定する
+    """
+    if not 1 <= limit <= 500:
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 500")
+    
+    before_created_at = None
+    before_id = None
+    if cursor:
+        try:
+            created_at_str, before_id = cursor.split("|", 1)
+            before_created_at = datetime.fromisoformat(created_at_str)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    
     try:
-        history = await db_service.get_all_processing_history()
-        return {"history": history}
+        history = await db_service.get_all_processing_history(before_created_at, before_id, limit)
+        next_cursor = None
+        if len(history) == limit:
+            last = history[-1]
+            next_cursor = f"{last['created_at']}|{last['id']}"
+        return {"history": history, "next_cursor": next_cursor}
     except Exception as e:
-        print(f"History fetch error: {e}")
+        logger.error("History fetch error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
+# 取引リストをJSONから一括で検証するためのアダプタ（pydantic-coreでパースと検証を一度に行う）
+transaction_list_adapter = TypeAdapter(List[TransactionData])
+
 @app.put("/results/{file_id}/transactions")
-async def update_transactions(file_id: str, transactions: List[TransactionData]):
+async def update_transactions(file_id: str, request: Request):
+    try:
+        transactions = transaction_list_adapter.validate_json(await request.body())
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False))
     await db_service.update_transactions(file_id, transactions)
     return {"status": "updated"}
 
+# CSV出力の列設定
+CSV_NUMERIC_COLUMNS = {"withdrawal", "deposit", "balance"}
+CSV_HEADER_MAP = {
+    "date": "日付",
+    "description": "摘要", 
+    "withdrawal": "出金",
+    "deposit": "入金",
+    "balance": "残高"
+}
+
+def _format_csv_number(value) -> str:
+    """数値フィールドを文字列化（整数値のfloatは小数点なしで出力し、Excelで数値として認識させる）"""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if isinstance(value, int):
+        return str(int(value))
+    return str(value)
+
+def _encode_csv_chunk(transactions: List[dict], columns: List[str], include_header: bool) -> bytes:
+    """取引データのバッチをCSVのバイト列に変換"""
+    # 列単位でまとめて文字列化する（型推論で整数がfloatにならないようobjectで保持）
+    df = pd.DataFrame(transactions, columns=columns, dtype=object)
+    for col in columns:
+        values = df[col]
+        missing = (values.isna() | (values == "")).to_numpy()
+        if col in CSV_NUMERIC_COLUMNS:
+            # 数値フィールド: 整数値のfloatのみ小数点なしで出力し、それ以外は値をそのまま文字列化
+            df[col] = [
+                "" if is_missing else _format_csv_number(value)
+                for value, is_missing in zip(values.to_numpy(), missing)
+            ]
+        else:
+            # テキストフィールドの処理
+            df[col] = values.astype(str).mask(missing, "")
+    
+    # Excel互換性向上のため全フィールドをクォート。先頭チャンクのみBOM付きUTF-8
+    csv_text = df.to_csv(
+        index=False,
+        header=[CSV_HEADER_MAP.get(col, col) for col in columns] if include_header else False,
+        quoting=csv.QUOTE_ALL,
+        lineterminator="\r\n"
+    )
+    return csv_text.encode('utf-8-sig' if include_header else 'utf-8')
+
 @app.get("/results/{file_id}/csv")
 async def download_csv(file_id: str):
-    result = await db_service.get_processing_result(file_id)
-    if not result:
+    export_info = await db_service.get_csv_export_info(file_id)
+    if export_info is None:
         raise HTTPException(status_code=404, detail="Result not found")
+    original_filename = export_info["filename"]
     
     # 日本語ファイル名対応
-    original_filename = result.get("filename", f"{file_id}.csv")
     if not original_filename.endswith('.csv'):
         csv_filename = f"{original_filename.rsplit('.', 1)[0]}.csv"
     else:
         csv_filename = original_filename
     
-    # CSV生成
-    output = io.StringIO()
-    writer = csv.writer(output, quoting=csv.QUOTE_ALL)  # Excel互換性向上のため全フィールドをクォート
+    # 保存時に計算済みの列構成を使用（列構成が未保存の古い結果は動的列を検出）
+    all_columns = export_info["csv_columns"]
+    if all_columns is None:
+        all_columns = build_csv_columns(await db_service.get_additional_columns(file_id))
     
-    transactions = result.get("transactions", [])
-    if not transactions:
-        # 空の場合のデフォルトヘッダー
-        writer.writerow(["日付", "摘要", "出金", "入金", "残高"])
-        writer.writerow(["", "", "", "", ""])  # 空行を追加してExcel表示を改善
-    else:
-        # 全取引データから動的に列を検出（より堅牢な実装）
-        all_unique_columns = set()
-        for transaction in transactions:
-            if isinstance(transaction, dict):
-                all_unique_columns.update(transaction.keys())
-        
-        # 基本列を最初に配置し、confidence_scoreを除外、その他の列を追加
-        basic_columns = ["date", "description", "withdrawal", "deposit", "balance"]
-        excluded_columns = {"confidence_score"}
-        
-        # 存在する基本列のみを含める
-        ordered_columns = [col for col in basic_columns if col in all_unique_columns]
-        
-        # 基本列以外の動的追加列をアルファベット順でソート
-        additional_columns = sorted([col for col in all_unique_columns 
-                                   if col not in basic_columns and col not in excluded_columns])
-        
-        all_columns = ordered_columns + additional_columns
-        
-        # ヘッダー行を日本語に変換
-        header_map = {
-            "date": "日付",
-            "description": "摘要", 
-            "withdrawal": "出金",
-            "deposit": "入金",
-            "balance": "残高"
-        }
-        headers = [header_map.get(col, col) for col in all_columns]
-        writer.writerow(headers)
+    async def csv_chunks():
+        """取引データをバッチ単位でCSVに変換しながら送信"""
+        header_sent = False
+        async for batch in db_service.iter_transactions(file_id):
+            yield _encode_csv_chunk(batch, all_columns, include_header=not header_sent)
+            header_sent = True
         
-        # データ行の処理
-        for transaction in transactions:
-            row = []
-            for col in all_columns:
-                value = transaction.get(col) if isinstance(transaction, dict) else getattr(transaction, col, None)
-                
-                # 数値フィールドの処理
-                if col in ["withdrawal", "deposit", "balance"]:
-                    if value is not None and value != "":
-                        try:
-                            # 数値の場合はそのまま出力（Excelで数値として認識される）
-                            formatted_value = str(int(value)) if isinstance(value, (int, float)) and value == int(value) else str(value)
-                            row.append(formatted_value)
-                        except (ValueError, TypeError):
-                            row.append(str(value) if value is not None else "")
-                    else:
-                        row.append("")
-                else:
-                    # テキストフィールドの処理
-                    row.append(str(value) if value is not None else "")
-            
-            writer.writerow(row)
-    
-    output.seek(0)
-    csv_content = output.getvalue()
+        if not header_sent:
+            # 空の場合のデフォルトヘッダー（空行を追加してExcel表示を改善）
+            empty_row = {col: "" for col in CSV_BASIC_COLUMNS}
+            yield _encode_csv_chunk([empty_row], CSV_BASIC_COLUMNS, include_header=True)
     
     # URLエンコードされた日本語ファイル名でContent-Dispositionヘッダーを設定
-    from urllib.parse import quote
     encoded_filename = quote(csv_filename.encode('utf-8'))
     
     return StreamingResponse(
-        io.BytesIO(csv_content.encode('utf-8-sig')),  # BOM付きUTF-8でExcel対応
+        csv_chunks(),
         media_type="text/csv; charset=utf-8",
         headers={
             "Content-Disposition": f"attachment; filename*=UTF-8''{encoded_filename}"
@@ -347,4 +450,4 @@ async def download_csv(file_id: str):
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=8000, loop="uvloop", http="httptools", ws="websockets")
\ No newline at end of file
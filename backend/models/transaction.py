@@ -1,4 +1,5 @@
 from pydantic import BaseModel, ConfigDict
+from dataclasses import dataclass
 from typing import Optional, List
 from datetime import datetime
 
@@ -12,10 +13,12 @@ class TransactionData(BaseModel):
     balance: int
     confidence_score: float = 0.0
 
-class ProcessingResult(BaseModel):
+# LLM処理結果の内部受け渡し用（APIスキーマではないため検証不要の軽量なslots付きdataclass）
+@dataclass(slots=True)
+class ProcessingResult:
     transactions: List[TransactionData]
     confidence_score: float
     processing_method: str
     claude_confidence: Optional[float] = None
     gpt4v_confidence: Optional[float] = None
-    agreement_score: Optional[float] = None
\ No newline at end of file
+    agreement_score: Optional[float] = None
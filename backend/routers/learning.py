@@ -2,14 +2,13 @@
 学習システムのAPIエンドポイント
 """
 
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request
 from typing import List, Dict, Optional, Any
 from pydantic import BaseModel
 from datetime import datetime
-import json
 
-from services.database import DatabaseService
 from services.learning_service import LearningService
+from services.database import SQL_GET_KANA_DICTIONARY, SQL_GET_CUSTOM_COLUMNS
 
 router = APIRouter(prefix="/api/learning", tags=["learning"])
 
@@ -41,11 +40,9 @@ class ExportPresetRequest(BaseModel):
     export_settings: Dict[str, Any]
     target_software: Optional[str] = None
 
-# 依存性注入
-async def get_learning_service() -> LearningService:
-    db_service = DatabaseService()
-    await db_service.initialize()
-    return LearningService(db_service.pool)
+# 依存性注入（startup時に生成した共有インスタンスを利用）
+async def get_learning_service(request: Request) -> LearningService:
+    return request.app.state.learning_service
 
 
 # エンドポイント
@@ -146,8 +143,8 @@ async def add_custom_column(
                 request.data_type,
                 request.default_value,
                 request.formula,
-                json.dumps(request.options) if request.options else None,
-                json.dumps({})  # 初期は空の値
+                request.options if request.options else None,
+                {}  # 初期は空の値
             )
         
         return {
@@ -167,14 +164,8 @@ async def get_custom_columns(
     """ファイルのカスタム列を取得"""
     try:
         async with service.db_pool.acquire() as conn:
-            columns = await conn.fetch(
-                """
-                SELECT * FROM custom_columns
-                WHERE file_id = $1
-                ORDER BY position, created_at
-                """,
-                file_id
-            )
+            stmt = await conn.prepared(SQL_GET_CUSTOM_COLUMNS)
+            columns = await stmt.fetch(file_id)
         
         return [dict(col) for col in columns]
     except Exception as e:
@@ -200,8 +191,8 @@ async def save_export_preset(
                 user_id,
                 request.preset_name,
                 request.description,
-                json.dumps(request.columns),
-                json.dumps(request.export_settings),
+                request.columns,
+                request.export_settings,
                 request.target_software
             )
         
@@ -271,16 +262,8 @@ async def get_kana_dictionary(
     """半角カナ辞書を取得"""
     try:
         async with service.db_pool.acquire() as conn:
-            entries = await conn.fetch(
-                """
-                SELECT kana_text, converted_text, confidence_score, 
-                       usage_count, bank_specific
-                FROM kana_dictionary
-                ORDER BY usage_count DESC, confidence_score DESC
-                LIMIT $1
-                """,
-                limit
-            )
+            stmt = await conn.prepared(SQL_GET_KANA_DICTIONARY)
+            entries = await stmt.fetch(limit)
         
         return [dict(entry) for entry in entries]
     except Exception as e:
@@ -303,6 +286,7 @@ async def add_kana_entry(
                 converted_text=converted_text,
                 bank_name=bank_specific
             )
+        service.invalidate_cache()
         
         return {
             "status": "success",
@@ -1,229 +1,315 @@
 #!/usr/bin/env python3
 import asyncio
 import asyncpg
+import aiofiles
 import os
 import sys
+import logging
 from pathlib import Path
 
+logger = logging.getLogger("migrations")
+
+# ヘッダーコメントにこの行を含むマイグレーションは、他のparallel-safeなファイルと並行実行できる
+PARALLEL_SAFE_MARKER = "-- parallel-safe"
+# parallel-safeなマイグレーションの最大同時実行数
+MIGRATION_POOL_SIZE = 8
+
+# ベーステーブル・学習システムテーブル・インデックス（1回のexecuteでまとめて実行）
+BASE_SCHEMA_SQL = """
+    -- 処理結果テーブル
+    CREATE TABLE IF NOT EXISTS processing_results (
+        id VARCHAR(36) PRIMARY KEY,
+        filename VARCHAR(255) NOT NULL,
+        status VARCHAR(20) NOT NULL DEFAULT 'pending',
+        confidence_score FLOAT DEFAULT 0.0,
+        processing_time FLOAT DEFAULT 0.0,
+        processing_method VARCHAR(20),
+        claude_confidence FLOAT,
+        gpt4v_confidence FLOAT,
+        agreement_score FLOAT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+
+    -- 取引データテーブル
+    CREATE TABLE IF NOT EXISTS transactions (
+        id SERIAL PRIMARY KEY,
+        processing_result_id VARCHAR(36) REFERENCES processing_results(id) ON DELETE CASCADE,
+        date VARCHAR(10) NOT NULL,
+        description TEXT NOT NULL,
+        withdrawal DECIMAL(15,2),
+        deposit DECIMAL(15,2),
+        balance DECIMAL(15,2) NOT NULL,
+        confidence_score FLOAT DEFAULT 0.0,
+        additional_data JSONB DEFAULT '{}',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_processing_results_created_at ON processing_results(created_at);
+    CREATE INDEX IF NOT EXISTS idx_transactions_processing_result_id ON transactions(processing_result_id);
+    CREATE INDEX IF NOT EXISTS idx_transactions_date ON transactions(date);
+
+    CREATE OR REPLACE FUNCTION update_updated_at_column()
+    RETURNS TRIGGER AS $$
+    BEGIN
+        NEW.updated_at = CURRENT_TIMESTAMP;
+        RETURN NEW;
+    END;
+    $$ language 'plpgsql';
+
+    DROP TRIGGER IF EXISTS update_processing_results_updated_at ON processing_results;
+    CREATE TRIGGER update_processing_results_updated_at 
+        BEFORE UPDATE ON processing_results 
+        FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+
+    DROP TRIGGER IF EXISTS update_transactions_updated_at ON transactions;
+    CREATE TRIGGER update_transactions_updated_at 
+        BEFORE UPDATE ON transactions 
+        FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+
+    -- 学習パターンテーブル
+    CREATE TABLE IF NOT EXISTS learning_patterns (
+        id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+        pattern_type VARCHAR(50) NOT NULL,
+        original_pattern TEXT NOT NULL,
+        corrected_pattern TEXT NOT NULL,
+        frequency INTEGER DEFAULT 1,
+        confidence_score FLOAT DEFAULT 0.5,
+        bank_name VARCHAR(255),
+        context JSONB,
+        last_used TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+
+    -- 修正履歴テーブル
+    CREATE TABLE IF NOT EXISTS correction_history (
+        id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+        file_id VARCHAR(255),
+        original_data JSONB NOT NULL,
+        corrected_data JSONB NOT NULL,
+        correction_type VARCHAR(50) NOT NULL,
+        position_info JSONB,
+        user_id VARCHAR(255),
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_pattern_type ON learning_patterns (pattern_type);
+    CREATE INDEX IF NOT EXISTS idx_pattern_bank ON learning_patterns (bank_name);
+    CREATE INDEX IF NOT EXISTS idx_pattern_frequency ON learning_patterns (frequency DESC);
+    CREATE INDEX IF NOT EXISTS idx_correction_file_id ON correction_history (file_id);
+    CREATE INDEX IF NOT EXISTS idx_correction_type ON correction_history (correction_type);
+    CREATE INDEX IF NOT EXISTS idx_correction_created ON correction_history (created_at);
+
+    -- カラムマッピングテーブル
+    CREATE TABLE IF NOT EXISTS column_mappings (
+        id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+        bank_name VARCHAR(255),
+        original_name VARCHAR(255) NOT NULL,
+        display_name VARCHAR(255) NOT NULL,
+        standard_name VARCHAR(255) NOT NULL,
+        data_type VARCHAR(50) NOT NULL,
+        position INTEGER NOT NULL,
+        validation_rules JSONB,
+        is_visible BOOLEAN DEFAULT TRUE,
+        is_editable BOOLEAN DEFAULT TRUE,
+        is_required BOOLEAN DEFAULT FALSE,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+
+    -- カスタム列テーブル
+    CREATE TABLE IF NOT EXISTS custom_columns (
+        id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+        file_id VARCHAR(255),
+        column_name VARCHAR(255) NOT NULL,
+        data_type VARCHAR(50) NOT NULL,
+        default_value TEXT,
+        formula TEXT,
+        options JSONB,
+        values JSONB NOT NULL,
+        position INTEGER,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+
+    -- エクスポートプリセットテーブル
+    CREATE TABLE IF NOT EXISTS export_presets (
+        id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+        user_id VARCHAR(255),
+        preset_name VARCHAR(255) NOT NULL,
+        description TEXT,
+        columns JSONB NOT NULL,
+        export_settings JSONB NOT NULL,
+        target_software VARCHAR(100),
+        is_default BOOLEAN DEFAULT FALSE,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+
+    -- 半角カナ辞書テーブル
+    CREATE TABLE IF NOT EXISTS kana_dictionary (
+        id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+        kana_text VARCHAR(255) NOT NULL UNIQUE,
+        converted_text VARCHAR(255) NOT NULL,
+        confidence_score FLOAT DEFAULT 0.9,
+        usage_count INTEGER DEFAULT 0,
+        bank_specific VARCHAR(255),
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+
+    -- 欠損パターンテーブル
+    CREATE TABLE IF NOT EXISTS missing_patterns (
+        id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+        bank_name VARCHAR(255),
+        page_position JSONB NOT NULL,
+        missed_content JSONB NOT NULL,
+        detection_hints TEXT[],
+        frequency INTEGER DEFAULT 1,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+
+    CREATE UNIQUE INDEX IF NOT EXISTS uk_bank_column ON column_mappings (bank_name, original_name);
+    CREATE INDEX IF NOT EXISTS idx_mapping_bank ON column_mappings (bank_name);
+    CREATE INDEX IF NOT EXISTS idx_mapping_position ON column_mappings (position);
+    CREATE INDEX IF NOT EXISTS idx_custom_file_id ON custom_columns (file_id);
+    CREATE INDEX IF NOT EXISTS idx_preset_user ON export_presets (user_id);
+    CREATE INDEX IF NOT EXISTS idx_preset_name ON export_presets (preset_name);
+    CREATE INDEX IF NOT EXISTS idx_kana_text ON kana_dictionary (kana_text);
+    CREATE INDEX IF NOT EXISTS idx_kana_usage ON kana_dictionary (usage_count DESC);
+    CREATE INDEX IF NOT EXISTS idx_missing_bank ON missing_patterns (bank_name);
+"""
+
+# 銀行別カラムマッピングと半角カナ辞書の初期データ
+DEFAULT_DATA_SQL = """
+    INSERT INTO column_mappings (bank_name, original_name, display_name, standard_name, data_type, position) VALUES
+    -- GMOあおぞら銀行
+    ('GMOあおぞら', '取引日', '日付', 'date', 'date', 1),
+    ('GMOあおぞら', 'お取引内容', '摘要', 'description', 'text', 2),
+    ('GMOあおぞら', 'お引出し', '出金', 'withdrawal', 'currency', 3),
+    ('GMOあおぞら', 'お預入れ', '入金', 'deposit', 'currency', 4),
+    ('GMOあおぞら', '残高', '残高', 'balance', 'currency', 5),
+    -- 三菱UFJ銀行
+    ('三菱UFJ', '日付', '日付', 'date', 'date', 1),
+    ('三菱UFJ', '摘要', '摘要', 'description', 'text', 2),
+    ('三菱UFJ', '支払金額', '出金', 'withdrawal', 'currency', 3),
+    ('三菱UFJ', '預り金額', '入金', 'deposit', 'currency', 4),
+    ('三菱UFJ', '差引残高', '残高', 'balance', 'currency', 5),
+    -- みずほ銀行
+    ('みずほ', '取引日', '日付', 'date', 'date', 1),
+    ('みずほ', 'お取引内容', '摘要', 'description', 'text', 2),
+    ('みずほ', 'お支払金額', '出金', 'withdrawal', 'currency', 3),
+    ('みずほ', 'お預り金額', '入金', 'deposit', 'currency', 4),
+    ('みずほ', 'お取引後残高', '残高', 'balance', 'currency', 5)
+    ON CONFLICT DO NOTHING;
+
+    INSERT INTO kana_dictionary (kana_text, converted_text, confidence_score) VALUES
+    ('ｼｬｶｲﾎｹﾝﾘｮｳ', '社会保険料', 0.95),
+    ('ﾃﾞﾝｷﾀﾞｲ', '電気代', 0.90),
+    ('ｶﾞｽﾀﾞｲ', 'ガス代', 0.90),
+    ('ｽｲﾄﾞｳﾀﾞｲ', '水道代', 0.90),
+    ('ｷｭｳﾖ', '給与', 0.95),
+    ('ｼｮｳﾖ', '賞与', 0.95),
+    ('ﾈﾝｷﾝ', '年金', 0.95),
+    ('ﾌﾘｺﾐ', '振込', 0.90),
+    ('ﾃｽｳﾘｮｳ', '手数料', 0.90),
+    ('ｶ)', '株式会社', 0.85),
+    ('ﾕ)', '有限会社', 0.85),
+    ('ｼﾞﾄﾞｳﾋｷｵﾄｼ', '自動引落', 0.90),
+    ('ｹｲﾀｲ', '携帯', 0.85),
+    ('ﾎｹﾝ', '保険', 0.90),
+    ('ｼﾞｭｳﾀｸﾛｰﾝ', '住宅ローン', 0.95),
+    ('ｶｰﾄﾞ', 'カード', 0.90),
+    ('ATM', 'ATM', 1.0),
+    ('ﾘｰｽ', 'リース', 0.90)
+    ON CONFLICT (kana_text) DO NOTHING;
+"""
+
+
+async def read_migration(migration_file: Path) -> str:
+    """マイグレーションファイルを非同期に読み込む"""
+    async with aiofiles.open(migration_file, 'r', encoding='utf-8') as f:
+        return await f.read()
+
+
+def is_parallel_safe(migration_sql: str) -> bool:
+    """先頭のコメント行にparallel-safeマーカーがあるか判定"""
+    for line in migration_sql.splitlines():
+        stripped = line.strip()
+        if not stripped:
+            continue
+        if not stripped.startswith("--"):
+            return False
+        if stripped == PARALLEL_SAFE_MARKER:
+            return True
+    return False
+
+
+async def apply_migration(conn, filename: str, migration_sql: str) -> bool:
+    """マイグレーションを適用済みとして記録してから実行（トランザクション内で呼び出すこと）
+
+    記録のINSERTがUNIQUE制約で競合した場合は適用済み（または他プロセスが適用中）としてスキップする
+    競合時は相手のトランザクション完了まで待つため、同じファイルが二重に実行されることはない
+    実行した場合はTrueを返す
+    """
+    claimed = await conn.fetchval(
+        "INSERT INTO migrations (filename) VALUES ($1) ON CONFLICT (filename) DO NOTHING RETURNING id",
+        filename
+    )
+    if claimed is None:
+        logger.debug("Migration %s already applied, skipping", filename)
+        return False
+    
+    logger.info("Running migration %s", filename)
+    await conn.execute(migration_sql)
+    logger.info("Migration %s completed successfully", filename)
+    return True
+
+
+async def apply_parallel_migration(pool, filename: str, migration_sql: str):
+    """parallel-safeなマイグレーションをプールの別接続・トランザクションで実行"""
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            await apply_migration(conn, filename, migration_sql)
+
+
 async def run_migrations():
     """Run database migrations"""
     database_url = os.getenv('DATABASE_URL')
     if not database_url:
-        print("DATABASE_URL environment variable not set")
+        logger.error("DATABASE_URL environment variable not set")
         sys.exit(1)
     
     try:
-        # Connect to the database
-        conn = await asyncpg.connect(database_url)
-        print("Connected to database successfully")
-        
-        # First, create the base tables
-        print("Creating base tables...")
-        await conn.execute("""
-            -- 処理結果テーブル
-            CREATE TABLE IF NOT EXISTS processing_results (
-                id VARCHAR(36) PRIMARY KEY,
-                filename VARCHAR(255) NOT NULL,
-                status VARCHAR(20) NOT NULL DEFAULT 'pending',
-                confidence_score FLOAT DEFAULT 0.0,
-                processing_time FLOAT DEFAULT 0.0,
-                processing_method VARCHAR(20),
-                claude_confidence FLOAT,
-                gpt4v_confidence FLOAT,
-                agreement_score FLOAT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        await conn.execute("""
-            -- 取引データテーブル
-            CREATE TABLE IF NOT EXISTS transactions (
-                id SERIAL PRIMARY KEY,
-                processing_result_id VARCHAR(36) REFERENCES processing_results(id) ON DELETE CASCADE,
-                date VARCHAR(10) NOT NULL,
-                description TEXT NOT NULL,
-                withdrawal DECIMAL(15,2),
-                deposit DECIMAL(15,2),
-                balance DECIMAL(15,2) NOT NULL,
-                confidence_score FLOAT DEFAULT 0.0,
-                additional_data JSONB DEFAULT '{}',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        # Create indexes
-        await conn.execute("CREATE INDEX IF NOT EXISTS idx_processing_results_created_at ON processing_results(created_at)")
-        await conn.execute("CREATE INDEX IF NOT EXISTS idx_transactions_processing_result_id ON transactions(processing_result_id)")
-        await conn.execute("CREATE INDEX IF NOT EXISTS idx_transactions_date ON transactions(date)")
-        
-        # Create trigger function
-        await conn.execute("""
-            CREATE OR REPLACE FUNCTION update_updated_at_column()
-            RETURNS TRIGGER AS $$
-            BEGIN
-                NEW.updated_at = CURRENT_TIMESTAMP;
-                RETURN NEW;
-            END;
-            $$ language 'plpgsql'
-        """)
-        
-        # Create triggers
-        await conn.execute("""
-            DROP TRIGGER IF EXISTS update_processing_results_updated_at ON processing_results;
-            CREATE TRIGGER update_processing_results_updated_at 
-                BEFORE UPDATE ON processing_results 
-                FOR EACH ROW EXECUTE FUNCTION update_updated_at_column()
-        """)
-        
-        await conn.execute("""
-            DROP TRIGGER IF EXISTS update_transactions_updated_at ON transactions;
-            CREATE TRIGGER update_transactions_updated_at 
-                BEFORE UPDATE ON transactions 
-                FOR EACH ROW EXECUTE FUNCTION update_updated_at_column()
-        """)
-        
-        print("Base tables created successfully")
-        
-        # Create learning system tables
-        print("Creating learning system tables...")
-        await conn.execute("""
-            -- 学習パターンテーブル
-            CREATE TABLE IF NOT EXISTS learning_patterns (
-                id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-                pattern_type VARCHAR(50) NOT NULL,
-                original_pattern TEXT NOT NULL,
-                corrected_pattern TEXT NOT NULL,
-                frequency INTEGER DEFAULT 1,
-                confidence_score FLOAT DEFAULT 0.5,
-                bank_name VARCHAR(255),
-                context JSONB,
-                last_used TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        await conn.execute("""
-            -- 修正履歴テーブル
-            CREATE TABLE IF NOT EXISTS correction_history (
-                id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-                file_id VARCHAR(255),
-                original_data JSONB NOT NULL,
-                corrected_data JSONB NOT NULL,
-                correction_type VARCHAR(50) NOT NULL,
-                position_info JSONB,
-                user_id VARCHAR(255),
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        # Create learning system indexes
-        await conn.execute("CREATE INDEX IF NOT EXISTS idx_pattern_type ON learning_patterns (pattern_type)")
-        await conn.execute("CREATE INDEX IF NOT EXISTS idx_pattern_bank ON learning_patterns (bank_name)")
-        await conn.execute("CREATE INDEX IF NOT EXISTS idx_pattern_frequency ON learning_patterns (frequency DESC)")
-        await conn.execute("CREATE INDEX IF NOT EXISTS idx_correction_file_id ON correction_history (file_id)")
-        await conn.execute("CREATE INDEX IF NOT EXISTS idx_correction_type ON correction_history (correction_type)")
-        await conn.execute("CREATE INDEX IF NOT EXISTS idx_correction_created ON correction_history (created_at)")
-        
-        print("Learning system tables created successfully")
-        
-        # Create additional learning system tables
-        print("Creating additional learning system tables...")
-        
-        await conn.execute("""
-            -- カラムマッピングテーブル
-            CREATE TABLE IF NOT EXISTS column_mappings (
-                id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-                bank_name VARCHAR(255),
-                original_name VARCHAR(255) NOT NULL,
-                display_name VARCHAR(255) NOT NULL,
-                standard_name VARCHAR(255) NOT NULL,
-                data_type VARCHAR(50) NOT NULL,
-                position INTEGER NOT NULL,
-                validation_rules JSONB,
-                is_visible BOOLEAN DEFAULT TRUE,
-                is_editable BOOLEAN DEFAULT TRUE,
-                is_required BOOLEAN DEFAULT FALSE,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        await conn.execute("""
-            -- カスタム列テーブル
-            CREATE TABLE IF NOT EXISTS custom_columns (
-                id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-                file_id VARCHAR(255),
-                column_name VARCHAR(255) NOT NULL,
-                data_type VARCHAR(50) NOT NULL,
-                default_value TEXT,
-                formula TEXT,
-                options JSONB,
-                values JSONB NOT NULL,
-                position INTEGER,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        await conn.execute("""
-            -- エクスポートプリセットテーブル
-            CREATE TABLE IF NOT EXISTS export_presets (
-                id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-                user_id VARCHAR(255),
-                preset_name VARCHAR(255) NOT NULL,
-                description TEXT,
-                columns JSONB NOT NULL,
-                export_settings JSONB NOT NULL,
-                target_software VARCHAR(100),
-                is_default BOOLEAN DEFAULT FALSE,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        await conn.execute("""
-            -- 半角カナ辞書テーブル
-            CREATE TABLE IF NOT EXISTS kana_dictionary (
-                id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-                kana_text VARCHAR(255) NOT NULL UNIQUE,
-                converted_text VARCHAR(255) NOT NULL,
-                confidence_score FLOAT DEFAULT 0.9,
-                usage_count INTEGER DEFAULT 0,
-                bank_specific VARCHAR(255),
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        await conn.execute("""
-            -- 欠損パターンテーブル
-            CREATE TABLE IF NOT EXISTS missing_patterns (
-                id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-                bank_name VARCHAR(255),
-                page_position JSONB NOT NULL,
-                missed_content JSONB NOT NULL,
-                detection_hints TEXT[],
-                frequency INTEGER DEFAULT 1,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        # Create indexes for additional tables
-        await conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS uk_bank_column ON column_mappings (bank_name, original_name)")
-        await conn.execute("CREATE INDEX IF NOT EXISTS idx_mapping_bank ON column_mappings (bank_name)")
-        await conn.execute("CREATE INDEX IF NOT EXISTS idx_mapping_position ON column_mappings (position)")
-        await conn.execute("CREATE INDEX IF NOT EXISTS idx_custom_file_id ON custom_columns (file_id)")
-        await conn.execute("CREATE INDEX IF NOT EXISTS idx_preset_user ON export_presets (user_id)")
-        await conn.execute("CREATE INDEX IF NOT EXISTS idx_preset_name ON export_presets (preset_name)")
-        await conn.execute("CREATE INDEX IF NOT EXISTS idx_kana_text ON kana_dictionary (kana_text)")
-        await conn.execute("CREATE INDEX IF NOT EXISTS idx_kana_usage ON kana_dictionary (usage_count DESC)")
-        await conn.execute("CREATE INDEX IF NOT EXISTS idx_missing_bank ON missing_patterns (bank_name)")
+        # Connect to the database (DDL中心のためステートメントキャッシュとJITは無効化)
+        # parallel-safeなマイグレーションを同時実行できるよう小さなプールを使用
+        pool = await asyncpg.create_pool(
+            database_url, min_size=1, max_size=MIGRATION_POOL_SIZE,
+            statement_cache_size=0, server_settings={'jit': 'off'}
+        )
+        try:
+            async with pool.acquire() as conn:
+                await _run_migrations(pool, conn)
+        finally:
+            await pool.close()
         
+    except Exception as e:
+        logger.error("Migration failed: %s", e)
+        sys.exit(1)
+
+
+async def _run_migrations(pool, conn):
+    """ベーススキーマの作成と未適用マイグレーションの実行"""
+    logger.info("Connected to database successfully")
+
+    logger.info("Creating base and learning system tables...")
+    async with conn.transaction():
+        await conn.execute(BASE_SCHEMA_SQL)
+
         # Insert default data
-        print("Inserting default data...")
-        
+        logger.info("Inserting default data...")
+
         # Default export presets
         await conn.execute("""
             INSERT INTO export_presets (preset_name, description, columns, export_settings, target_software, is_default) VALUES
@@ -248,122 +334,76 @@ async def run_migrations():
         '["date", "description", "withdrawal", "deposit"]',
         '{"delimiter": ",", "encoding": "Shift-JIS", "dateFormat": "YYYY/MM/DD", "numberFormat": {"thousandSeparator": false, "decimalPlaces": 0}}'
         )
-        
-        # Default column mappings for major banks
-        await conn.execute("""
-            INSERT INTO column_mappings (bank_name, original_name, display_name, standard_name, data_type, position) VALUES
-            -- GMOあおぞら銀行
-            ('GMOあおぞら', '取引日', '日付', 'date', 'date', 1),
-            ('GMOあおぞら', 'お取引内容', '摘要', 'description', 'text', 2),
-            ('GMOあおぞら', 'お引出し', '出金', 'withdrawal', 'currency', 3),
-            ('GMOあおぞら', 'お預入れ', '入金', 'deposit', 'currency', 4),
-            ('GMOあおぞら', '残高', '残高', 'balance', 'currency', 5),
-            -- 三菱UFJ銀行
-            ('三菱UFJ', '日付', '日付', 'date', 'date', 1),
-            ('三菱UFJ', '摘要', '摘要', 'description', 'text', 2),
-            ('三菱UFJ', '支払金額', '出金', 'withdrawal', 'currency', 3),
-            ('三菱UFJ', '預り金額', '入金', 'deposit', 'currency', 4),
-            ('三菱UFJ', '差引残高', '残高', 'balance', 'currency', 5),
-            -- みずほ銀行
-            ('みずほ', '取引日', '日付', 'date', 'date', 1),
-            ('みずほ', 'お取引内容', '摘要', 'description', 'text', 2),
-            ('みずほ', 'お支払金額', '出金', 'withdrawal', 'currency', 3),
-            ('みずほ', 'お預り金額', '入金', 'deposit', 'currency', 4),
-            ('みずほ', 'お取引後残高', '残高', 'balance', 'currency', 5)
-            ON CONFLICT DO NOTHING
-        """)
-        
-        # Default kana dictionary entries
-        await conn.execute("""
-            INSERT INTO kana_dictionary (kana_text, converted_text, confidence_score) VALUES
-            ('ｼｬｶｲﾎｹﾝﾘｮｳ', '社会保険料', 0.95),
-            ('ﾃﾞﾝｷﾀﾞｲ', '電気代', 0.90),
-            ('ｶﾞｽﾀﾞｲ', 'ガス代', 0.90),
-            ('ｽｲﾄﾞｳﾀﾞｲ', '水道代', 0.90),
-            ('ｷｭｳﾖ', '給与', 0.95),
-            ('ｼｮｳﾖ', '賞与', 0.95),
-            ('ﾈﾝｷﾝ', '年金', 0.95),
-            ('ﾌﾘｺﾐ', '振込', 0.90),
-            ('ﾃｽｳﾘｮｳ', '手数料', 0.90),
-            ('ｶ)', '株式会社', 0.85),
-            ('ﾕ)', '有限会社', 0.85),
-            ('ｼﾞﾄﾞｳﾋｷｵﾄｼ', '自動引落', 0.90),
-            ('ｹｲﾀｲ', '携帯', 0.85),
-            ('ﾎｹﾝ', '保険', 0.90),
-            ('ｼﾞｭｳﾀｸﾛｰﾝ', '住宅ローン', 0.95),
-            ('ｶｰﾄﾞ', 'カード', 0.90),
-            ('ATM', 'ATM', 1.0),
-            ('ﾘｰｽ', 'リース', 0.90)
-            ON CONFLICT (kana_text) DO NOTHING
-        """)
-        
-        print("Additional learning system tables and data created successfully")
-        
-        # Get migrations directory
-        migrations_dir = Path(__file__).parent / 'db' / 'migrations'
-        if not migrations_dir.exists():
-            migrations_dir = Path(__file__).parent.parent / 'db' / 'migrations'
-        if not migrations_dir.exists():
-            # Try relative to working directory
-            migrations_dir = Path('./db/migrations')
-        if not migrations_dir.exists():
-            migrations_dir = Path('./backend/db/migrations')
-        
-        if not migrations_dir.exists():
-            print("Migrations directory not found")
-            await conn.close()
-            return
-            
-        # Get all migration files
-        migration_files = sorted(migrations_dir.glob('*.sql'))
-        print(f"Found {len(migration_files)} migration files")
-        
-        # Create migrations tracking table if it doesn't exist
-        await conn.execute("""
-            CREATE TABLE IF NOT EXISTS migrations (
-                id SERIAL PRIMARY KEY,
-                filename VARCHAR(255) UNIQUE NOT NULL,
-                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        # Check which migrations have been applied
-        applied_migrations = await conn.fetch("SELECT filename FROM migrations")
-        applied_filenames = {row['filename'] for row in applied_migrations}
-        
-        # Run pending migrations
-        for migration_file in migration_files:
-            filename = migration_file.name
-            
-            if filename in applied_filenames:
-                print(f"Migration {filename} already applied, skipping")
-                continue
-                
-            print(f"Running migration {filename}")
-            
-            try:
-                # Read and execute migration
-                migration_sql = migration_file.read_text(encoding='utf-8')
-                await conn.execute(migration_sql)
-                
-                # Mark migration as applied
-                await conn.execute(
-                    "INSERT INTO migrations (filename) VALUES ($1)",
-                    filename
-                )
-                
-                print(f"Migration {filename} completed successfully")
-                
-            except Exception as e:
-                print(f"Error running migration {filename}: {e}")
-                raise e
-        
-        await conn.close()
-        print("All migrations completed successfully")
-        
-    except Exception as e:
-        print(f"Migration failed: {e}")
-        sys.exit(1)
+
+        await conn.execute(DEFAULT_DATA_SQL)
+
+    logger.info("Tables and default data created successfully")
+
+    # Get migrations directory
+    migrations_dir = Path(__file__).parent / 'db' / 'migrations'
+    if not migrations_dir.exists():
+        migrations_dir = Path(__file__).parent.parent / 'db' / 'migrations'
+    if not migrations_dir.exists():
+        # Try relative to working directory
+        migrations_dir = Path('./db/migrations')
+    if not migrations_dir.exists():
+        migrations_dir = Path('./backend/db/migrations')
+
+    if not migrations_dir.exists():
+        logger.warning("Migrations directory not found")
+        return
+
+    # Get all migration files
+    migration_files = sorted(migrations_dir.glob('*.sql'))
+    logger.info("Found %d migration files", len(migration_files))
+
+    # Create migrations tracking table if it doesn't exist
+    await conn.execute("""
+        CREATE TABLE IF NOT EXISTS migrations (
+            id SERIAL PRIMARY KEY,
+            filename VARCHAR(255) UNIQUE NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    # 適用済みかどうかは各ファイルの記録INSERT（filenameのUNIQUEインデックス）で判定する
+    migration_sqls = await asyncio.gather(*(read_migration(f) for f in migration_files))
+    pending = [
+        (migration_file.name, migration_sql, is_parallel_safe(migration_sql))
+        for migration_file, migration_sql in zip(migration_files, migration_sqls)
+    ]
+
+    # 連続するparallel-safe/通常のマイグレーションごとにグループ化し、順序を保って実行
+    index = 0
+    while index < len(pending):
+        parallel = pending[index][2]
+        group = []
+        while index < len(pending) and pending[index][2] == parallel:
+            group.append(pending[index])
+            index += 1
+
+        try:
+            if parallel:
+                await asyncio.gather(*(
+                    apply_parallel_migration(pool, filename, migration_sql)
+                    for filename, migration_sql, _ in group
+                ))
+            else:
+                # 通常のマイグレーションはまとめて1トランザクション（1回のCOMMIT）で実行
+                async with conn.transaction():
+                    await conn.execute("SET LOCAL synchronous_commit = off")
+                    for filename, migration_sql, _ in group:
+                        await apply_migration(conn, filename, migration_sql)
+        except Exception as e:
+            logger.error("Error running migrations %s: %s", ', '.join(f for f, _, _ in group), e)
+            raise e
+
+    logger.info("All migrations completed successfully")
+
 
 if __name__ == "__main__":
+    logging.basicConfig(
+        level=os.getenv("LOG_LEVEL", "INFO").upper(),
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+    )
     asyncio.run(run_migrations())
\ No newline at end of file
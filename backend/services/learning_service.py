@@ -3,25 +3,67 @@
 修正履歴の記録、パターン学習、自動修正機能を提供
 """
 
+import asyncio
 import json
 import re
+from collections import Counter, OrderedDict
 from typing import Dict, List, Optional, Any, Tuple
 from datetime import datetime
 import asyncpg
+import numpy as np
 from uuid import UUID
 import logging
 
+from models.transaction import TransactionData
+from services.database import (
+    SQL_GET_BANK_COLUMN_MAPPINGS,
+    SQL_GET_DESCRIPTION_PATTERNS,
+    SQL_GET_DESCRIPTION_PATTERNS_VERSION,
+    SQL_GET_KANA_CONVERSIONS,
+    SQL_GET_KANA_DICTIONARY_VERSION,
+    SQL_UPSERT_LEARNING_PATTERN,
+)
+
 logger = logging.getLogger(__name__)
 
+# 半角カナ（ｦ〜ﾟ）の検出用パターン
+HALFWIDTH_KANA_PATTERN = re.compile(r'[ｦ-ﾟ]')
+
+# カラムマッピング1件分の挿入（executemanyで一括実行する）
+SQL_INSERT_COLUMN_MAPPING = """
+    INSERT INTO column_mappings
+    (bank_name, original_name, display_name, standard_name, 
+     data_type, position, validation_rules, is_visible, 
+     is_editable, is_required)
+    VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10)
+"""
+
 
 class LearningService:
     """学習システムのメインサービスクラス"""
     
+    # 修正結果キャッシュの最大件数
+    CORRECTION_CACHE_SIZE = 10000
+    
     def __init__(self, db_pool: asyncpg.Pool):
         self.db_pool = db_pool
         self.kana_converter = KanaConverter(db_pool)
         self.pattern_analyzer = PatternAnalyzer(db_pool)
         self.column_mapper = ColumnMapper(db_pool)
+        # (銀行名, 摘要) -> 修正後の摘要
+        self._correction_cache: OrderedDict[Tuple[Optional[str], str], str] = OrderedDict()
+        # (テーブルのバージョン, 解析済みの摘要パターン)
+        self._description_patterns: Optional[Tuple[Tuple, Dict[str, str]]] = None
+    
+    def invalidate_cache(self):
+        """学習内容が変わった際に修正結果のキャッシュを破棄"""
+        self._correction_cache.clear()
+        self._description_patterns = None
+        self.kana_converter.invalidate_cache()
+    
+    async def close(self):
+        """終了時に未反映の使用回数を書き込む"""
+        await self.kana_converter.close()
         
     async def record_correction(
         self,
@@ -44,10 +86,10 @@ class LearningService:
                 RETURNING id
                 """,
                 file_id,
-                json.dumps(original_data),
-                json.dumps(corrected_data),
+                original_data,
+                corrected_data,
                 correction_type,
-                json.dumps(position_info) if position_info else None,
+                position_info if position_info else None,
                 user_id
             )
             
@@ -55,6 +97,7 @@ class LearningService:
             await self._learn_from_correction(
                 conn, original_data, corrected_data, correction_type
             )
+            self.invalidate_cache()
             
             logger.info(f"Recorded correction {correction_id} for file {file_id}")
             return str(correction_id)
@@ -82,13 +125,15 @@ class LearningService:
             await self._update_learning_pattern(
                 conn,
                 pattern_type,
-                str(original),
-                str(corrected)
+                json.dumps(original, ensure_ascii=False, default=str),
+                json.dumps(corrected, ensure_ascii=False, default=str),
+                original.get('description') if pattern_type == 'description' else None,
+                corrected.get('description') if pattern_type == 'description' else None
             )
     
     def _is_kana(self, text: str) -> bool:
         """半角カナを含むかチェック"""
-        return bool(re.search(r'[ｦ-ﾟ]+', text))
+        return HALFWIDTH_KANA_PATTERN.search(text) is not None
     
     def _determine_pattern_type(self, original: Dict, corrected: Dict) -> Optional[str]:
         """修正パターンのタイプを判定"""
@@ -106,41 +151,16 @@ class LearningService:
         conn: asyncpg.Connection,
         pattern_type: str,
         original: str,
-        corrected: str
+        corrected: str,
+        original_desc: Optional[str] = None,
+        corrected_desc: Optional[str] = None
     ):
-        """学習パターンを更新"""
-        existing = await conn.fetchrow(
-            """
-            SELECT id, frequency FROM learning_patterns
-            WHERE pattern_type = $1 AND original_pattern = $2 
-            AND corrected_pattern = $3
-            """,
-            pattern_type, original, corrected
-        )
+        """学習パターンを更新（original/correctedはJSON文字列）
         
-        if existing:
-            # 既存パターンの頻度を増加
-            await conn.execute(
-                """
-                UPDATE learning_patterns 
-                SET frequency = frequency + 1,
-                    confidence_score = LEAST(1.0, confidence_score + 0.08),
-                    last_used = CURRENT_TIMESTAMP,
-                    updated_at = CURRENT_TIMESTAMP
-                WHERE id = $1
-                """,
-                existing['id']
-            )
-        else:
-            # 新規パターンを追加
-            await conn.execute(
-                """
-                INSERT INTO learning_patterns 
-                (pattern_type, original_pattern, corrected_pattern)
-                VALUES ($1, $2, $3)
-                """,
-                pattern_type, original, corrected
-            )
+        既存パターンなら頻度と信頼度を上げ、なければ新規追加する（1文で原子的に実行）
+        """
+        stmt = await conn.prepared(SQL_UPSERT_LEARNING_PATTERN)
+        await stmt.fetch(pattern_type, original, corrected, original_desc, corrected_desc)
     
     async def apply_learned_corrections(
         self,
@@ -149,203 +169,343 @@ class LearningService:
     ) -> List[Dict]:
         """学習済みパターンを適用して自動修正"""
         
-        corrected_transactions = []
+        # 辞書の使用回数更新はまとめて最後に反映する
+        usage_counts: Counter = Counter()
+        
+        # 摘要のある取引がなければDBにアクセスせずに返す
+        if not any(
+            isinstance(t.get('description'), str) and t.get('description')
+            for t in transactions
+        ):
+            return transactions
         
         async with self.db_pool.acquire() as conn:
+            # 他のプロセスで変換辞書が更新されていれば修正結果も作り直す
+            if await self.kana_converter.refresh_dictionary(conn):
+                self._correction_cache.clear()
+            # 学習パターンは取引ごとではなく一度だけ取得
+            patterns = await self._load_description_patterns(conn)
             for transaction in transactions:
-                # 半角カナ変換
-                if 'description' in transaction:
-                    transaction['description'] = await self.kana_converter.convert(
-                        conn, transaction['description'], bank_name
+                description = transaction.get('description')
+                if description and isinstance(description, str):
+                    transaction['description'] = await self._correct_description(
+                        conn, description, bank_name, usage_counts, patterns
                     )
-                
-                # その他の学習パターン適用
-                transaction = await self._apply_patterns(conn, transaction, bank_name)
-                
-                corrected_transactions.append(transaction)
+            
+        # 使用回数はレスポンスを待たせないようバックグラウンドでまとめて反映する
+        if usage_counts:
+            self.kana_converter.defer_usage_counts(usage_counts)
+        
+        return transactions
+    
+    async def apply_learned_corrections_models(
+        self,
+        transactions: List[TransactionData],
+        bank_name: Optional[str] = None
+    ) -> List[TransactionData]:
+        """学習済みパターンをTransactionDataに直接適用して自動修正（変更があった行のみ更新）"""
+        
+        usage_counts: Counter = Counter()
+        
+        # 摘要のある取引がなければDBにアクセスせずに返す
+        if not any(t.description for t in transactions):
+            return transactions
+        
+        async with self.db_pool.acquire() as conn:
+            # 他のプロセスで変換辞書が更新されていれば修正結果も作り直す
+            if await self.kana_converter.refresh_dictionary(conn):
+                self._correction_cache.clear()
+            # 学習パターンは取引ごとではなく一度だけ取得
+            patterns = await self._load_description_patterns(conn)
+            for transaction in transactions:
+                if not transaction.description:
+                    continue
+                corrected = await self._correct_description(
+                    conn, transaction.description, bank_name, usage_counts, patterns
+                )
+                if corrected != transaction.description:
+                    transaction.description = corrected
+            
+        # 使用回数はレスポンスを待たせないようバックグラウンドでまとめて反映する
+        if usage_counts:
+            self.kana_converter.defer_usage_counts(usage_counts)
         
-        return corrected_transactions
+        return transactions
     
-    async def _apply_patterns(
+    async def _correct_description(
         self,
         conn: asyncpg.Connection,
-        transaction: Dict,
-        bank_name: Optional[str]
-    ) -> Dict:
-        """学習パターンを適用"""
+        description: str,
+        bank_name: Optional[str],
+        usage_counts: Counter,
+        patterns: Dict[str, str]
+    ) -> str:
+        """摘要に半角カナ変換と学習パターンを適用（結果はキャッシュ）"""
         
-        # 高頻度パターンを取得
-        patterns = await conn.fetch(
-            """
-            SELECT original_pattern, corrected_pattern, pattern_type
-            FROM learning_patterns
-            WHERE confidence_score > 0.6
-            ORDER BY frequency DESC
-            LIMIT 100
-            """
+        # 同じ摘要の修正結果が既にあれば再利用
+        cache_key = (bank_name, description)
+        if cache_key in self._correction_cache:
+            self._correction_cache.move_to_end(cache_key)
+            return self._correction_cache[cache_key]
+        
+        # 半角カナ変換
+        converted = await self.kana_converter.convert(
+            conn, description, bank_name, usage_counts
         )
         
-        for pattern in patterns:
-            transaction = self._try_apply_pattern(
-                transaction,
-                pattern['original_pattern'],
-                pattern['corrected_pattern'],
-                pattern['pattern_type']
-            )
+        # その他の学習パターン適用
+        corrected = self._apply_patterns(converted, patterns)
+        
+        self._correction_cache[cache_key] = corrected
+        if len(self._correction_cache) > self.CORRECTION_CACHE_SIZE:
+            self._correction_cache.popitem(last=False)
         
-        return transaction
+        return corrected
     
-    def _try_apply_pattern(
-        self,
-        transaction: Dict,
-        original: str,
-        corrected: str,
-        pattern_type: str
-    ) -> Dict:
-        """個別パターンの適用を試みる"""
-        try:
-            # パターンを辞書に変換
-            import ast
-            original_dict = ast.literal_eval(original)
-            corrected_dict = ast.literal_eval(corrected)
-            
-            # descriptionフィールドのパターン適用
-            if pattern_type == 'description' and 'description' in original_dict and 'description' in transaction:
-                original_desc = original_dict['description']
-                if transaction['description'] == original_desc:
-                    # corrected_dictにfieldやidが含まれている場合は除去
-                    if 'description' in corrected_dict:
-                        transaction['description'] = corrected_dict['description']
-                        print(f"Applied learning pattern: '{original_desc}' -> '{corrected_dict['description']}'")
-                    
-            # 部分一致による適用も試みる
-            elif pattern_type == 'description' and 'description' in original_dict and 'description' in transaction:
-                original_desc = original_dict['description']
-                if original_desc in transaction['description']:
-                    if 'description' in corrected_dict:
-                        transaction['description'] = transaction['description'].replace(
-                            original_desc, corrected_dict['description']
-                        )
-                        print(f"Applied partial learning pattern: '{original_desc}' -> '{corrected_dict['description']}'")
-                    
-            return transaction
-            
-        except (ValueError, SyntaxError) as e:
-            # パターン解析エラーの場合はログ出力して元のtransactionを返す
-            print(f"Pattern parsing error: {e}")
-            return transaction
+    async def _load_description_patterns(self, conn: asyncpg.Connection) -> Dict[str, str]:
+        """高頻度の学習パターンを取得し、修正前の摘要→最終的な修正後の摘要の辞書に変換
+        
+        パターンの件数と最終更新日時が変わっていなければ前回の解析結果を再利用する
+        """
+        
+        stmt = await conn.prepared(SQL_GET_DESCRIPTION_PATTERNS_VERSION)
+        version = tuple(await stmt.fetchrow() or ())
+        if self._description_patterns is not None:
+            if self._description_patterns[0] == version:
+                return self._description_patterns[1]
+            # 他のプロセスでパターンが更新された場合は修正結果も作り直す
+            self._correction_cache.clear()
+        
+        stmt = await conn.prepared(SQL_GET_DESCRIPTION_PATTERNS)
+        rows = await stmt.fetch()
+        
+        patterns = [(row['original_desc'], row['corrected_desc']) for row in rows]
+        
+        # パターンを頻度順に連続適用した結果を修正前の摘要ごとに事前計算しておく
+        corrections: Dict[str, str] = {}
+        for original_desc, _ in patterns:
+            if original_desc in corrections:
+                continue
+            description = original_desc
+            for pattern_original, pattern_corrected in patterns:
+                if description == pattern_original:
+                    description = pattern_corrected
+            corrections[original_desc] = description
+        
+        self._description_patterns = (version, corrections)
+        return corrections
+    
+    def _apply_patterns(self, description: str, patterns: Dict[str, str]) -> str:
+        """学習パターンを摘要に適用（摘要全体が一致するパターンを1回の辞書引きで適用）"""
+        
+        corrected = patterns.get(description)
+        if corrected is None:
+            return description
+        
+        logger.debug("Applied learning pattern: %r -> %r", description, corrected)
+        return corrected
 
 
 class KanaConverter:
     """半角カナ変換処理クラス"""
     
+    # 変換結果キャッシュ（LRU）の上限件数
+    CACHE_SIZE = 10000
+    # 使用回数をまとめてDBに反映する間隔（秒）
+    USAGE_FLUSH_INTERVAL = 0.5
+    
     def __init__(self, db_pool: asyncpg.Pool):
         self.db_pool = db_pool
-        self._cache = {}
+        self._cache: OrderedDict[Tuple[str, Optional[str]], str] = OrderedDict()
+        # DBから一括で読み込んだ変換辞書。辞書更新時に破棄
+        # (完全一致用の (半角カナ, 銀行名)→変換後, 部分変換用の正規表現, 部分変換用の半角カナ→変換後)
+        self._dictionary: Optional[
+            Tuple[Dict[Tuple[str, Optional[str]], str], Optional[re.Pattern], Dict[str, str]]
+        ] = None
+        # 未反映の使用回数と、それを書き込むバックグラウンドタスク
+        self._pending_usage: Counter = Counter()
+        self._usage_task: Optional[asyncio.Task] = None
+        # 変換結果・辞書を作成した時点の辞書テーブルのバージョン（件数, 最終更新日時）
+        self._dictionary_version: Optional[Tuple] = None
+    
+    def invalidate_cache(self):
+        """辞書が変わった際に変換結果と読み込み済みの辞書を破棄"""
+        self._cache.clear()
+        self._dictionary = None
+    
+    async def refresh_dictionary(self, conn: asyncpg.Connection) -> bool:
+        """辞書テーブルの件数と最終更新日時が変わっていれば変換結果と辞書を破棄
+        
+        他のプロセスで辞書が更新された場合も検出できるよう、一括処理の開始時に呼び出す。
+        破棄した場合はTrueを返す
+        """
+        stmt = await conn.prepared(SQL_GET_KANA_DICTIONARY_VERSION)
+        version = tuple(await stmt.fetchrow() or ())
+        if version == self._dictionary_version:
+            return False
+        self.invalidate_cache()
+        self._dictionary_version = version
+        return True
         
     async def convert(
         self,
         conn: asyncpg.Connection,
         text: str,
-        bank_name: Optional[str] = None
+        bank_name: Optional[str] = None,
+        usage_counts: Optional[Counter] = None
     ) -> str:
-        """半角カナを変換"""
+        """半角カナを変換（usage_countsを渡した場合、使用回数は呼び出し側で集計してdefer_usage_countsに渡す）"""
         
         if not self._contains_kana(text):
             return text
         
         # キャッシュチェック
-        cache_key = f"{text}:{bank_name}"
+        cache_key = (text, bank_name)
         if cache_key in self._cache:
+            self._cache.move_to_end(cache_key)
             return self._cache[cache_key]
         
-        # データベースから変換パターンを取得
-        result = await self._lookup_conversion(conn, text, bank_name)
+        # 読み込み済みの辞書から変換パターンを取得（未読込ならDBから一括取得）
+        exact, pattern, replacements = await self._get_dictionary(conn)
+        result = self._lookup_conversion(exact, text, bank_name)
         
         if result:
-            self._cache[cache_key] = result
+            self._store_cache(cache_key, result)
             # 使用回数を更新
-            await self._update_usage_count(conn, text)
+            if usage_counts is not None:
+                usage_counts[text] += 1
+            else:
+                self.defer_usage_counts(Counter({text: 1}))
             return result
         
         # 部分一致で変換を試みる
-        converted = await self._partial_conversion(conn, text, bank_name)
-        self._cache[cache_key] = converted
+        converted = self._partial_conversion(pattern, replacements, text)
+        self._store_cache(cache_key, converted)
         return converted
     
+    def _store_cache(self, cache_key: Tuple[str, Optional[str]], value: str):
+        """変換結果をキャッシュに保存（上限を超えた分は古い順に破棄）"""
+        self._cache[cache_key] = value
+        self._cache.move_to_end(cache_key)
+        if len(self._cache) > self.CACHE_SIZE:
+            self._cache.popitem(last=False)
+    
     def _contains_kana(self, text: str) -> bool:
         """半角カナを含むかチェック"""
-        return bool(re.search(r'[ｦ-ﾟ]+', text))
+        return HALFWIDTH_KANA_PATTERN.search(text) is not None
     
-    async def _lookup_conversion(
+    def _lookup_conversion(
         self,
-        conn: asyncpg.Connection,
+        exact: Dict[Tuple[str, Optional[str]], str],
         text: str,
         bank_name: Optional[str]
     ) -> Optional[str]:
-        """完全一致での変換を検索"""
+        """完全一致での変換を検索（銀行固有の変換を汎用変換より優先）"""
         
-        # 銀行固有の変換を優先
         if bank_name:
-            result = await conn.fetchval(
-                """
-                SELECT converted_text FROM kana_dictionary
-                WHERE kana_text = $1 AND bank_specific = $2
-                """,
-                text, bank_name
-            )
+            result = exact.get((text, bank_name))
             if result:
                 return result
-        
-        # 汎用変換を検索
-        return await conn.fetchval(
-            """
-            SELECT converted_text FROM kana_dictionary
-            WHERE kana_text = $1 AND bank_specific IS NULL
-            ORDER BY confidence_score DESC, usage_count DESC
-            LIMIT 1
-            """,
-            text
-        )
+        return exact.get((text, None))
     
-    async def _partial_conversion(
+    def _partial_conversion(
         self,
-        conn: asyncpg.Connection,
-        text: str,
-        bank_name: Optional[str]
+        pattern: Optional[re.Pattern],
+        replacements: Dict[str, str],
+        text: str
     ) -> str:
-        """部分的な変換を適用"""
+        """部分的な変換を適用（長いパターンを優先して1回の走査で置換）"""
         
-        # すべての変換パターンを取得
-        patterns = await conn.fetch(
-            """
-            SELECT kana_text, converted_text 
-            FROM kana_dictionary
-            WHERE confidence_score > 0.6
-            ORDER BY LENGTH(kana_text) DESC, usage_count DESC
-            """
-        )
+        if pattern is None:
+            return text
         
-        result = text
-        for pattern in patterns:
-            if pattern['kana_text'] in result:
-                result = result.replace(
-                    pattern['kana_text'],
-                    pattern['converted_text']
-                )
+        return pattern.sub(lambda m: replacements[m.group(0)], text)
+    
+    async def _get_dictionary(
+        self,
+        conn: asyncpg.Connection
+    ) -> Tuple[Dict[Tuple[str, Optional[str]], str], Optional[re.Pattern], Dict[str, str]]:
+        """変換辞書を取得（未読込ならDBから1回のクエリで全件を取得して構築）"""
+        
+        if self._dictionary is None:
+            # 信頼度・使用回数の高い順に全パターンを取得
+            stmt = await conn.prepared(SQL_GET_KANA_CONVERSIONS)
+            rows = await stmt.fetch()
+            
+            # 完全一致用: 同じ (半角カナ, 銀行名) は信頼度・使用回数の高い変換を優先
+            exact: Dict[Tuple[str, Optional[str]], str] = {}
+            for row in rows:
+                exact.setdefault((row['kana_text'], row['bank_specific']), row['converted_text'])
+            
+            # 部分変換用: 信頼度の高いパターンのみ、同じ半角カナは使用回数の多い変換を優先
+            replacements: Dict[str, str] = {}
+            partial_rows = sorted(
+                (row for row in rows if row['kana_text'] and row['confidence_score'] > 0.6),
+                key=lambda row: row['usage_count'],
+                reverse=True
+            )
+            for row in partial_rows:
+                replacements.setdefault(row['kana_text'], row['converted_text'])
+            
+            # 長い順の選択肢にすることで各位置で最長一致のパターンが選ばれる
+            pattern = re.compile(
+                '|'.join(map(re.escape, sorted(replacements, key=len, reverse=True)))
+            ) if replacements else None
+            self._dictionary = (exact, pattern, replacements)
         
-        return result
+        return self._dictionary
     
-    async def _update_usage_count(self, conn: asyncpg.Connection, kana_text: str):
-        """使用回数を更新"""
-        await conn.execute(
+    def defer_usage_counts(self, usage_counts: Counter):
+        """使用回数の更新を変換処理から切り離し、バックグラウンドでまとめて反映"""
+        self._pending_usage.update(usage_counts)
+        if self._usage_task is None or self._usage_task.done():
+            self._usage_task = asyncio.create_task(self._usage_flusher())
+    
+    async def _usage_flusher(self):
+        """一定間隔で溜まった使用回数を一括更新（未反映分がなくなれば終了）"""
+        while self._pending_usage:
+            await asyncio.sleep(self.USAGE_FLUSH_INTERVAL)
+            await self._flush_usage_counts()
+    
+    async def _flush_usage_counts(self):
+        """未反映の使用回数を一括でDBに書き込む"""
+        usage_counts, self._pending_usage = self._pending_usage, Counter()
+        if not usage_counts:
+            return
+        try:
+            async with self.db_pool.acquire() as conn:
+                await self.update_usage_counts(conn, usage_counts)
+        except asyncio.CancelledError:
+            # 書き込み中に止められた分は終了時の書き込みに回す（executemanyは原子的）
+            self._pending_usage.update(usage_counts)
+            raise
+        except Exception as e:
+            # 使用回数は統計情報のため、失敗しても変換処理には影響させない
+            logger.warning("Failed to update kana usage counts: %s", e)
+    
+    async def close(self):
+        """フラッシュ待ちのタスクを止め、残っている使用回数を書き込む"""
+        if self._usage_task is not None and not self._usage_task.done():
+            self._usage_task.cancel()
+            try:
+                await self._usage_task
+            except asyncio.CancelledError:
+                pass
+        self._usage_task = None
+        await self._flush_usage_counts()
+    
+    async def update_usage_counts(self, conn: asyncpg.Connection, usage_counts: Counter):
+        """複数エントリの使用回数を一括更新
+        
+        updated_atは辞書の内容の変更検出に使うため、使用回数の更新では変えない
+        """
+        await conn.executemany(
             """
             UPDATE kana_dictionary 
-            SET usage_count = usage_count + 1,
-                updated_at = CURRENT_TIMESTAMP
+            SET usage_count = usage_count + $2
             WHERE kana_text = $1
             """,
-            kana_text
+            list(usage_counts.items())
         )
     
     async def learn_pattern(
@@ -355,40 +515,25 @@ class KanaConverter:
         converted_text: str,
         bank_name: Optional[str] = None
     ):
-        """新しい変換パターンを学習"""
+        """新しい変換パターンを学習
+        
+        同じ変換が登録済みなら信頼度を上げる。半角カナが別の変換で登録済みの場合は何もしない
+        """
         
-        existing = await conn.fetchrow(
+        await conn.execute(
             """
-            SELECT id, usage_count FROM kana_dictionary
-            WHERE kana_text = $1 AND converted_text = $2
-            AND (bank_specific = $3 OR (bank_specific IS NULL AND $3 IS NULL))
+            INSERT INTO kana_dictionary 
+            (kana_text, converted_text, bank_specific, confidence_score)
+            VALUES ($1, $2, $3, 0.5)
+            ON CONFLICT (kana_text) DO UPDATE
+            SET usage_count = kana_dictionary.usage_count + 1,
+                confidence_score = LEAST(1.0, kana_dictionary.confidence_score + 0.05),
+                updated_at = CURRENT_TIMESTAMP
+            WHERE kana_dictionary.converted_text = EXCLUDED.converted_text
+            AND kana_dictionary.bank_specific IS NOT DISTINCT FROM EXCLUDED.bank_specific
             """,
             kana_text, converted_text, bank_name
         )
-        
-        if existing:
-            # 既存パターンの信頼度を上げる
-            await conn.execute(
-                """
-                UPDATE kana_dictionary 
-                SET usage_count = usage_count + 1,
-                    confidence_score = LEAST(1.0, confidence_score + 0.05),
-                    updated_at = CURRENT_TIMESTAMP
-                WHERE id = $1
-                """,
-                existing['id']
-            )
-        else:
-            # 新規パターンを追加
-            await conn.execute(
-                """
-                INSERT INTO kana_dictionary 
-                (kana_text, converted_text, bank_specific, confidence_score)
-                VALUES ($1, $2, $3, 0.5)
-                ON CONFLICT (kana_text) DO NOTHING
-                """,
-                kana_text, converted_text, bank_name
-            )
 
 
 class PatternAnalyzer:
@@ -476,6 +621,29 @@ class PatternAnalyzer:
 class ColumnMapper:
     """カラムマッピング処理クラス"""
     
+    # ヘッダー名と標準カラム名の対応
+    COMMON_HEADERS = {
+        '日付': 'date',
+        '取引日': 'date',
+        '摘要': 'description',
+        'お取引内容': 'description',
+        '出金': 'withdrawal',
+        'お引出し': 'withdrawal',
+        '支払金額': 'withdrawal',
+        '入金': 'deposit',
+        'お預入れ': 'deposit',
+        '預り金額': 'deposit',
+        '残高': 'balance',
+        '差引残高': 'balance',
+        'お取引後残高': 'balance'
+    }
+    # 先読みで重なり合う出現（例: 差引残高 と 残高）も拾い、長いヘッダーを優先する
+    _HEADER_PATTERN = re.compile(
+        '(?=(' + '|'.join(
+            re.escape(h) for h in sorted(COMMON_HEADERS, key=len, reverse=True)
+        ) + '))'
+    )
+    
     def __init__(self, db_pool: asyncpg.Pool):
         self.db_pool = db_pool
     
@@ -483,14 +651,8 @@ class ColumnMapper:
         """銀行別のカラムマッピングを取得"""
         
         async with self.db_pool.acquire() as conn:
-            mappings = await conn.fetch(
-                """
-                SELECT * FROM column_mappings
-                WHERE bank_name = $1
-                ORDER BY position
-                """,
-                bank_name
-            )
+            stmt = await conn.prepared(SQL_GET_BANK_COLUMN_MAPPINGS)
+            mappings = await stmt.fetch(bank_name)
             
             return [dict(m) for m in mappings]
     
@@ -502,40 +664,39 @@ class ColumnMapper:
         """カラムマッピングを保存"""
         
         async with self.db_pool.acquire() as conn:
-            # 既存のマッピングを削除
-            await conn.execute(
-                "DELETE FROM column_mappings WHERE bank_name = $1",
-                bank_name
-            )
+            # 削除と挿入を1トランザクションで行う
+            async with conn.transaction():
+                # 既存のマッピングを削除
+                await conn.execute(
+                    "DELETE FROM column_mappings WHERE bank_name = $1",
+                    bank_name
+                )
             
-            # 新しいマッピングを挿入
-            for i, mapping in enumerate(mappings):
-                # 必須フィールドの検証
-                source_col = mapping.get('source_column', '')
-                target_col = mapping.get('target_column', '')
+                # 新しいマッピングをまとめて挿入
+                rows = []
+                for i, mapping in enumerate(mappings):
+                    # 必須フィールドの検証
+                    source_col = mapping.get('source_column', '')
+                    target_col = mapping.get('target_column', '')
                 
-                if not source_col or not target_col:
-                    continue  # 不正なマッピングはスキップ
+                    if not source_col or not target_col:
+                        continue  # 不正なマッピングはスキップ
                 
-                await conn.execute(
-                    """
-                    INSERT INTO column_mappings
-                    (bank_name, original_name, display_name, standard_name, 
-                     data_type, position, validation_rules, is_visible, 
-                     is_editable, is_required)
-                    VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10)
-                    """,
-                    bank_name,
-                    source_col,
-                    source_col,
-                    target_col,
-                    mapping.get('data_type', 'text'),
-                    i + 1,
-                    None,
-                    True,
-                    True,
-                    False
-                )
+                    rows.append((
+                        bank_name,
+                        source_col,
+                        source_col,
+                        target_col,
+                        mapping.get('data_type', 'text'),
+                        i + 1,
+                        None,
+                        True,
+                        True,
+                        False
+                    ))
+            
+                if rows:
+                    await conn.executemany(SQL_INSERT_COLUMN_MAPPING, rows)
 
     async def save_custom_mapping(
         self,
@@ -545,72 +706,58 @@ class ColumnMapper:
         """カスタムマッピングを保存"""
         
         async with self.db_pool.acquire() as conn:
-            # 既存のマッピングを削除
-            await conn.execute(
-                "DELETE FROM column_mappings WHERE bank_name = $1",
-                bank_name
-            )
-            
-            # 新しいマッピングを挿入
-            for mapping in mappings:
+            # 削除と挿入を1トランザクションで行う
+            async with conn.transaction():
+                # 既存のマッピングを削除
                 await conn.execute(
-                    """
-                    INSERT INTO column_mappings
-                    (bank_name, original_name, display_name, standard_name, 
-                     data_type, position, validation_rules, is_visible, 
-                     is_editable, is_required)
-                    VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10)
-                    """,
-                    bank_name,
-                    mapping['original_name'],
-                    mapping['display_name'],
-                    mapping['standard_name'],
-                    mapping['data_type'],
-                    mapping['position'],
-                    json.dumps(mapping.get('validation_rules')),
-                    mapping.get('is_visible', True),
-                    mapping.get('is_editable', True),
-                    mapping.get('is_required', False)
+                    "DELETE FROM column_mappings WHERE bank_name = $1",
+                    bank_name
                 )
+            
+                # 新しいマッピングをまとめて挿入
+                rows = [
+                    (
+                        bank_name,
+                        mapping['original_name'],
+                        mapping['display_name'],
+                        mapping['standard_name'],
+                        mapping['data_type'],
+                        mapping['position'],
+                        mapping.get('validation_rules'),
+                        mapping.get('is_visible', True),
+                        mapping.get('is_editable', True),
+                        mapping.get('is_required', False)
+                    )
+                    for mapping in mappings
+                ]
+            
+                if rows:
+                    await conn.executemany(SQL_INSERT_COLUMN_MAPPING, rows)
     
     async def detect_columns_from_text(
         self,
         text: str,
         bank_name: Optional[str] = None
     ) -> List[Dict]:
-        """テキストからカラム構造を検出"""
-        
-        # ヘッダー行を検出するロジック
-        # ここでは簡単な実装例
-        common_headers = {
-            '日付': 'date',
-            '取引日': 'date',
-            '摘要': 'description',
-            'お取引内容': 'description',
-            '出金': 'withdrawal',
-            'お引出し': 'withdrawal',
-            '支払金額': 'withdrawal',
-            '入金': 'deposit',
-            'お預入れ': 'deposit',
-            '預り金額': 'deposit',
-            '残高': 'balance',
-            '差引残高': 'balance',
-            'お取引後残高': 'balance'
-        }
+        """テキストからカラム構造を検出（テキスト中の出現順に並べる）"""
+        
+        # 全ヘッダーを1回の走査で検索し、各ヘッダーの最初の出現位置を記録
+        first_positions = {}
+        for match in self._HEADER_PATTERN.finditer(text):
+            first_positions.setdefault(match.group(1), match.start())
         
         detected_columns = []
-        position = 1
-        
-        for header, standard_name in common_headers.items():
-            if header in text:
-                detected_columns.append({
-                    'original_name': header,
-                    'display_name': header,
-                    'standard_name': standard_name,
-                    'data_type': self._get_data_type(standard_name),
-                    'position': position
-                })
-                position += 1
+        headers = sorted(first_positions, key=first_positions.get)
+        
+        for position, header in enumerate(headers, 1):
+            standard_name = self.COMMON_HEADERS[header]
+            detected_columns.append({
+                'original_name': header,
+                'display_name': header,
+                'standard_name': standard_name,
+                'data_type': self._get_data_type(standard_name),
+                'position': position
+            })
         
         return detected_columns
     
@@ -668,22 +815,40 @@ class MissingDataDetector:
         """残高の整合性をチェック"""
         issues = []
         
-        for i in range(1, len(transactions)):
+        count = len(transactions)
+        if count < 2:
+            return issues
+        
+        # 列ごとに配列化し、前行残高との差分をまとめて計算
+        balance = np.fromiter(
+            (t.get('balance', 0) for t in transactions), dtype=np.float64, count=count
+        )
+        withdrawal = np.fromiter(
+            (t.get('withdrawal', 0) for t in transactions), dtype=np.float64, count=count
+        )
+        deposit = np.fromiter(
+            (t.get('deposit', 0) for t in transactions), dtype=np.float64, count=count
+        )
+        
+        expected = balance[:-1] - withdrawal[1:] + deposit[1:]
+        inconsistent = np.flatnonzero(np.abs(expected - balance[1:]) > 1)  # 誤差許容
+        
+        # 不整合な行のみ元の値から結果を組み立てる
+        for i in (inconsistent + 1).tolist():
             prev_balance = transactions[i-1].get('balance', 0)
             current_balance = transactions[i].get('balance', 0)
-            withdrawal = transactions[i].get('withdrawal', 0)
-            deposit = transactions[i].get('deposit', 0)
+            withdrawal_value = transactions[i].get('withdrawal', 0)
+            deposit_value = transactions[i].get('deposit', 0)
             
-            expected_balance = prev_balance - withdrawal + deposit
+            expected_balance = prev_balance - withdrawal_value + deposit_value
             
-            if abs(expected_balance - current_balance) > 1:  # 誤差許容
-                issues.append({
-                    'type': 'balance_inconsistency',
-                    'position': i,
-                    'expected': expected_balance,
-                    'actual': current_balance,
-                    'difference': expected_balance - current_balance
-                })
+            issues.append({
+                'type': 'balance_inconsistency',
+                'position': i,
+                'expected': expected_balance,
+                'actual': current_balance,
+                'difference': expected_balance - current_balance
+            })
         
         return issues
     
@@ -1,82 +1,153 @@
 import asyncio
 import base64
 import json
-from typing import Dict, Any, List
+import logging
+import orjson
+from concurrent.futures import Executor
+from typing import Dict, Any, AsyncIterator, List, Optional, Tuple
 from openai import AsyncOpenAI
 from anthropic import AsyncAnthropic
 import os
+import aiofiles
+import httpx
 from models.transaction import TransactionData, ProcessingResult
 from utils.text_normalizer import TextNormalizer
 import fitz  # PyMuPDF
-from PIL import Image
-import io
+
+logger = logging.getLogger(__name__)
+
+# PDFページを画像化する際の最大解像度
+MAX_RENDER_DPI = 200
+# Claudeが画像を縮小する長辺のピクセル数（これ以上の解像度は精度に寄与しない）
+MAX_IMAGE_EDGE_PX = 1568
+
+# LLMに返させる取引データのJSONスキーマ（Claudeのツール入力・GPT-4oの構造化出力で共用）
+TRANSACTION_EXTRACTION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "transactions": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "date": {"type": "string"},
+                    "description": {"type": "string"},
+                    "withdrawal": {"type": ["integer", "null"]},
+                    "deposit": {"type": ["integer", "null"]},
+                    "balance": {"type": "integer"},
+                    "confidence_score": {"type": "number"}
+                },
+                "required": ["date", "description", "withdrawal", "deposit", "balance", "confidence_score"],
+                "additionalProperties": False
+            }
+        },
+        "confidence": {"type": "number"}
+    },
+    "required": ["transactions", "confidence"],
+    "additionalProperties": False
+}
+
+
+def _count_pdf_pages(pdf_path: str) -> int:
+    """PDFのページ数を取得（プロセスプールで実行）"""
+    with fitz.open(pdf_path) as pdf_document:
+        return pdf_document.page_count
+
+
+def _render_pdf_page(pdf_path: str, page_num: int) -> bytes:
+    """PDFの1ページを画像に変換（CPU負荷が高いためプロセスプールで実行）"""
+    with fitz.open(pdf_path) as pdf_document:
+        # ページを取得
+        page = pdf_document[page_num]
+        
+        # ページを画像に変換（最大200 DPI）
+        # LLM側で長辺MAX_IMAGE_EDGE_PX程度に縮小されるため、それを超える解像度では描画しない
+        dpi = min(MAX_RENDER_DPI, MAX_IMAGE_EDGE_PX * 72 / max(page.rect.width, page.rect.height))
+        mat = fitz.Matrix(dpi/72, dpi/72)
+        pix = page.get_pixmap(matrix=mat, colorspace=fitz.csRGB, alpha=False)
+        
+        # PNG形式のバイトデータに変換
+        img_data = pix.tobytes("png")
+        
+        # 画像サイズが4MBを超える場合、JPEG形式に変換して圧縮（複数画像の場合は余裕を持たせる）
+        if len(img_data) > 4 * 1024 * 1024:  # 4MB
+            print(f"Page {page_num + 1} image too large ({len(img_data)} bytes), converting to JPEG...")
+            
+            # ピクセルデータから直接JPEGにエンコード（品質を調整して4MB以下に）
+            quality = 85
+            while quality > 30:
+                img_data = pix.tobytes("jpg", jpg_quality=quality)
+                if len(img_data) < 4 * 1024 * 1024:
+                    break
+                quality -= 10
+            
+            print(f"Page {page_num + 1} compressed to JPEG: {len(img_data)} bytes (quality={quality})")
+    
+    return img_data
+
+
+def _encode_base64(image_data: bytes) -> str:
+    """画像をBase64文字列に変換（イベントループを塞がないようスレッドプールで実行）"""
+    return base64.b64encode(image_data).decode('ascii')
+
 
 class DualLLMProcessor:
     def __init__(self):
-        self.openai_client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-        self.anthropic_client = AsyncAnthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
+        # 両APIで共有するHTTPクライアント。ページの並行解析（1ページ最大2リクエスト）分の接続を
+        # キープアライブで保持し、ページごとのTCP/TLS接続確立を避ける
+        page_concurrency = max(1, int(os.getenv("LLM_PAGE_CONCURRENCY", "5")))
+        self.http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=page_concurrency * 4,
+                max_keepalive_connections=page_concurrency * 2,
+                keepalive_expiry=60.0
+            )
+        )
+        self.openai_client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), http_client=self.http_client)
+        self.anthropic_client = AsyncAnthropic(api_key=os.getenv("ANTHROPIC_API_KEY"), http_client=self.http_client)
+        # CPU負荷の高い前処理（PDFラスタライズ）用のプロセスプール。startup時に設定される
+        # 未設定の場合はデフォルトのスレッドプールで実行
+        self.process_pool: Optional[Executor] = None
 
-    async def _convert_pdf_to_images(self, pdf_data: bytes, progress_callback=None) -> List[bytes]:
-        """PDFを画像に変換（全ページ）"""
+    async def _iter_pdf_images(self, pdf_path: str, page_count: int) -> AsyncIterator[Tuple[int, bytes]]:
+        """PDFを画像に変換し、ページ順に (ページ番号, 画像) を1枚ずつ返す
+        
+        PDF_CHUNK_SIZE（既定: 8）ページずつまとめて変換するため、
+        全ページの画像を同時にメモリへ保持しない
+        """
         try:
-            # PDFドキュメントを開く
-            pdf_document = fitz.open(stream=pdf_data, filetype="pdf")
-            page_count = pdf_document.page_count
-            print(f"PDF has {page_count} pages")
+            loop = asyncio.get_running_loop()
+            chunk_size = max(1, int(os.getenv("PDF_CHUNK_SIZE", "8")))
+            # チャンク内のページを同時にプロセスプールへ投入（同時実行数はPDF_RENDER_WORKERSで制限）
+            max_workers = max(1, min(int(os.getenv("PDF_RENDER_WORKERS", os.cpu_count() or 1)), chunk_size))
+            semaphore = asyncio.Semaphore(max_workers)
             
-            images = []
-            for page_num in range(page_count):
-                if progress_callback:
-                    # 変換進捗を0-5%で表示
-                    convert_progress = int((page_num / page_count) * 5)
-                    await progress_callback(f"Converting page {page_num + 1}/{page_count} to image...", progress=convert_progress)
-                
-                # ページを取得
-                page = pdf_document[page_num]
-                
-                # ページを高解像度の画像に変換（DPI=200）
-                # 5MB制限内に収めつつ、十分な解像度を維持
-                mat = fitz.Matrix(200/72, 200/72)  # 200 DPI (5MB制限対応)
-                pix = page.get_pixmap(matrix=mat, alpha=False)
-                
-                # PNG形式のバイトデータに変換
-                img_data = pix.tobytes("png")
-                
-                # 画像サイズが4MBを超える場合、JPEG形式に変換して圧縮（複数画像の場合は余裕を持たせる）
-                if len(img_data) > 4 * 1024 * 1024:  # 4MB
-                    print(f"Page {page_num + 1} image too large ({len(img_data)} bytes), converting to JPEG...")
-                    from PIL import Image
-                    import io
-                    
-                    # PILで画像を開く
-                    img = Image.open(io.BytesIO(img_data))
-                    
-                    # JPEG形式で保存（品質を調整して4MB以下に）
-                    output = io.BytesIO()
-                    quality = 85
-                    while quality > 30:
-                        output.seek(0)
-                        output.truncate()
-                        img.save(output, format='JPEG', quality=quality, optimize=True)
-                        if output.tell() < 4 * 1024 * 1024:
-                            break
-                        quality -= 10
-                    
-                    img_data = output.getvalue()
-                    print(f"Page {page_num + 1} compressed to JPEG: {len(img_data)} bytes (quality={quality})")
-                
-                images.append(img_data)
+            async def render(page_num: int) -> bytes:
+                async with semaphore:
+                    # ワーカーにはファイルパスのみを渡す（PDF本体をプロセス間でコピーしない）
+                    img_data = await loop.run_in_executor(
+                        self.process_pool, _render_pdf_page, pdf_path, page_num
+                    )
                 print(f"Page {page_num + 1} converted. Size: {len(img_data)} bytes")
+                return img_data
             
-            pdf_document.close()
-            
-            print(f"PDF successfully converted to {len(images)} images")
-            return images
+            for chunk_start in range(0, page_count, chunk_size):
+                pages = range(chunk_start, min(chunk_start + chunk_size, page_count))
+                # gatherは投入順に結果を返すため、ページ順は保たれる
+                chunk = await asyncio.gather(*(render(page_num) for page_num in pages))
+                for page_num, img_data in zip(pages, chunk):
+                    yield page_num, img_data
+                # 次のチャンク変換前に返却済みの画像を解放
+                del chunk
             
         except Exception as e:
             print(f"PDF conversion error: {e}")
             raise Exception(f"PDF conversion failed: {str(e)}")
     
+    async def close(self):
+        """共有HTTPクライアントの接続を閉じる"""
+        await self.http_client.aclose()
+    
     async def _detect_file_type(self, data: bytes) -> str:
         """ファイル種類を検出"""
         if data.startswith(b'%PDF'):
@@ -88,11 +159,13 @@ class DualLLMProcessor:
         else:
             return 'unknown'
 
-    async def process_document(self, image_data: bytes, progress_callback=None) -> ProcessingResult:
-        print(f"Starting document processing. Image size: {len(image_data)} bytes")
+    async def process_document(self, file_path: str, progress_callback=None) -> ProcessingResult:
+        print(f"Starting document processing. File: {file_path}, size: {os.path.getsize(file_path)} bytes")
         
-        # ファイル種類を検出
-        file_type = await self._detect_file_type(image_data)
+        # ファイル種類を先頭バイトから検出
+        async with aiofiles.open(file_path, 'rb') as f:
+            header = await f.read(8)
+        file_type = await self._detect_file_type(header)
         print(f"Detected file type: {file_type}")
         
         # PDFの場合は各ページを画像に変換
@@ -102,33 +175,57 @@ class DualLLMProcessor:
                 if progress_callback:
                     await progress_callback("Converting PDF pages to images...", progress=5)
                     
-                images = await self._convert_pdf_to_images(image_data, progress_callback)
-                print(f"PDF converted to {len(images)} images")
+                loop = asyncio.get_running_loop()
+                page_count = await loop.run_in_executor(self.process_pool, _count_pdf_pages, file_path)
+                print(f"PDF has {page_count} pages")
                 
                 if progress_callback:
-                    await progress_callback(f"PDF converted to {len(images)} images. Starting analysis...", progress=10)
+                    await progress_callback(f"PDF has {page_count} pages. Starting analysis...", progress=10)
                 
-                # 各ページを処理して結果を統合
-                all_transactions = []
-                total_confidence = 0
+                # 各ページを変換しながらLLMで並行処理（同時実行数はLLM_PAGE_CONCURRENCYで制限）
+                # 処理中のページ数が上限に達している間は次ページの変換も待たせ、画像を溜め込まない
+                semaphore = asyncio.Semaphore(max(1, int(os.getenv("LLM_PAGE_CONCURRENCY", "5"))))
+                page_results: Dict[int, ProcessingResult] = {}
+                completed = 0
                 
-                for i, img_data in enumerate(images):
-                    # 進捗率を計算 (10% + (i/total_pages) * 80%)
-                    progress_percent = 10 + int((i / len(images)) * 80)
+                async def analyze_page(i: int, img_data: bytes):
+                    nonlocal completed
+                    try:
+                        page_result = await self._process_single_image(img_data, page_num=i+1)
+                    finally:
+                        semaphore.release()
+                    page_results[i] = page_result
+                    completed += 1
                     
-                    if progress_callback:
-                        await progress_callback(f"Analyzing page {i + 1}/{len(images)} with AI...", progress=progress_percent)
-                    
-                    # 各ページをLLMで処理
-                    page_result = await self._process_single_image(img_data, page_num=i+1)
+                    # ページ処理完了後の進捗更新（完了順に通知）
+                    if progress_callback and page_result and hasattr(page_result, 'transactions'):
+                        progress_percent = 10 + int((completed / page_count) * 80)
+                        await progress_callback(f"Page {i + 1} completed: {len(page_result.transactions)} transactions found", progress=progress_percent)
+                
+                tasks = []
+                try:
+                    async for i, img_data in self._iter_pdf_images(file_path, page_count):
+                        await semaphore.acquire()
+                        
+                        if progress_callback:
+                            # 進捗率を計算 (10% + (完了ページ数/total_pages) * 80%)
+                            progress_percent = 10 + int((completed / page_count) * 80)
+                            await progress_callback(f"Analyzing page {i + 1}/{page_count} with AI...", progress=progress_percent)
+                        
+                        tasks.append(asyncio.create_task(analyze_page(i, img_data)))
                     
+                    await asyncio.gather(*tasks)
+                finally:
+                    # 途中で失敗した場合は処理中のページを中断
+                    for task in tasks:
+                        task.cancel()
+                
+                # ページ順に結果を統合
+                all_transactions = []
+                for i in sorted(page_results):
+                    page_result = page_results[i]
                     if page_result and hasattr(page_result, 'transactions'):
                         all_transactions.extend(page_result.transactions)
-                        total_confidence += page_result.confidence_score
-                        
-                        # ページ処理完了後の進捗更新
-                        if progress_callback:
-                            await progress_callback(f"Page {i + 1} completed: {len(page_result.transactions)} transactions found", progress=progress_percent + int(80/len(images)))
                 
                 # 結果統合中
                 if progress_callback:
@@ -152,9 +249,7 @@ class DualLLMProcessor:
                 )
                 
             except Exception as e:
-                print(f"PDF processing failed: {e}")
-                import traceback
-                traceback.print_exc()
+                logger.exception("PDF processing failed: %s", e)
                 # エラー時は空の結果を返す
                 return ProcessingResult(
                     transactions=[],
@@ -163,6 +258,8 @@ class DualLLMProcessor:
                 )
         
         # PDF以外の画像は従来通り処理
+        async with aiofiles.open(file_path, 'rb') as f:
+            image_data = await f.read()
         return await self._process_single_image(image_data)
     
     async def _process_single_image(self, image_data: bytes, page_num: int = 1) -> ProcessingResult:
@@ -196,25 +293,35 @@ class DualLLMProcessor:
             quality_score = await self._assess_image_quality(image_data)
             print(f"Image quality score: {quality_score}")
             
+            # Base64エンコードとメディアタイプ判定は1回だけ行い、各APIリクエストで共有
+            # エンコードは画像サイズに比例して時間がかかるため、スレッドプールで実行
+            loop = asyncio.get_running_loop()
+            base64_image = await loop.run_in_executor(None, _encode_base64, image_data)
+            media_type = self._detect_media_type(image_data)
+            
             if quality_score > 0.8:
                 print("Using Claude-only processing")
-                return await self._claude_only_processing(image_data)
+                return await self._claude_only_processing(base64_image, media_type)
             elif quality_score > 0.5:
                 print("Using staged processing")
-                return await self._staged_processing(image_data)
+                return await self._staged_processing(base64_image, media_type)
             else:
                 print("Using parallel processing")
-                return await self._parallel_processing(image_data)
+                return await self._parallel_processing(base64_image, media_type)
         except Exception as e:
-            print(f"LLM processing error: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("LLM processing error: %s", e)
             print("Falling back to mock data")
             # フォールバック：モックデータを返す
             return self._create_mock_result()
 
-    async def _claude_only_processing(self, image_data: bytes) -> ProcessingResult:
-        result = await self._claude_extract(image_data)
+    def _detect_media_type(self, image_data: bytes) -> str:
+        """画像の先頭バイトからメディアタイプを判定"""
+        if image_data.startswith(b'\xff\xd8\xff'):  # JPEG
+            return "image/jpeg"
+        return "image/png"  # PNG・その他はPNGとして扱う
+
+    async def _claude_only_processing(self, base64_image: str, media_type: str) -> ProcessingResult:
+        result = await self._claude_extract(base64_image, media_type)
         # transactionsをTransactionDataオブジェクトに変換
         transactions = []
         overall_confidence = result.get("confidence", 0.85)
@@ -240,29 +347,33 @@ class DualLLMProcessor:
             claude_confidence=overall_confidence
         )
 
-    async def _staged_processing(self, image_data: bytes) -> ProcessingResult:
-        # Step 1: Claude で構造化抽出
-        claude_result = await self._claude_extract(image_data)
+    async def _staged_processing(self, base64_image: str, media_type: str) -> ProcessingResult:
+        # Step 1: Claude で構造化抽出（GPT-4oの抽出を並行して開始）
+        gpt4v_task = asyncio.create_task(self._gpt4v_extract(base64_image, media_type))
+        try:
+            claude_result = await self._claude_extract(base64_image, media_type)
+        except BaseException:
+            gpt4v_task.cancel()
+            raise
         
-        # Step 2: GPT-4V で数値検証
-        gpt4v_result = await self._gpt4v_validate(image_data, claude_result)
+        # Step 2: 並行実行したGPT-4oの抽出結果を数値検証の結果として使う
+        # （GPT-4oの呼び出しは1ページにつき1回のみで、取り消して課金が無駄になることはない）
+        gpt4v_result = await gpt4v_task
         
         # Step 3: 結果統合
         return self._merge_results(claude_result, gpt4v_result, "staged")
 
-    async def _parallel_processing(self, image_data: bytes) -> ProcessingResult:
+    async def _parallel_processing(self, base64_image: str, media_type: str) -> ProcessingResult:
         # 並列処理
-        claude_task = self._claude_extract(image_data)
-        gpt4v_task = self._gpt4v_extract(image_data)
+        claude_task = self._claude_extract(base64_image, media_type)
+        gpt4v_task = self._gpt4v_extract(base64_image, media_type)
         
         claude_result, gpt4v_result = await asyncio.gather(claude_task, gpt4v_task)
         
         # 結果統合
         return self._merge_results(claude_result, gpt4v_result, "parallel")
 
-    async def _claude_extract(self, image_data: bytes) -> Dict[str, Any]:
-        base64_image = base64.b64encode(image_data).decode('utf-8')
-        
+    async def _claude_extract(self, base64_image: str, media_type: str) -> Dict[str, Any]:
         prompt = """
         銀行通帳の画像から「すべての」取引データを抽出してください。
         画像に表示されているすべての行を確認し、一つも漏らさずに抽出してください。
@@ -327,17 +438,18 @@ class DualLLMProcessor:
         """
 
         try:
-            # 画像の種類を判定してメディアタイプを設定
-            if base64_image.startswith('/9j/'):  # JPEG
-                media_type = "image/jpeg"
-            elif base64_image.startswith('iVBOR'):  # PNG
-                media_type = "image/png"
-            else:
-                media_type = "image/png"  # デフォルトはPNG
-            
             response = await self.anthropic_client.messages.create(
                 model="claude-3-5-sonnet-20241022",  # 最新モデルに更新
                 max_tokens=4000,  # より多くのトランザクションに対応
+                # 抽出結果はツール入力としてスキーマ通りの辞書で受け取る
+                tools=[
+                    {
+                        "name": "record_transactions",
+                        "description": "通帳画像から抽出した取引データを記録する",
+                        "input_schema": TRANSACTION_EXTRACTION_SCHEMA
+                    }
+                ],
+                tool_choice={"type": "tool", "name": "record_transactions"},
                 messages=[
                     {
                         "role": "user",
@@ -356,7 +468,14 @@ class DualLLMProcessor:
                 ]
             )
             
-            # レスポンスからJSONを抽出
+            # ツール呼び出しの入力を取得（JSONの解析は不要）
+            for block in response.content:
+                if block.type == "tool_use":
+                    result = block.input
+                    print(f"Successfully received structured output with {len(result.get('transactions', []))} transactions")
+                    return result
+            
+            # ツール呼び出しがない場合はテキストからJSONを抽出
             response_text = response.content[0].text
             print(f"Claude raw response (first 500 chars): {response_text[:500]}")
             
@@ -368,36 +487,24 @@ class DualLLMProcessor:
                 
                 if json_start != -1 and json_end > json_start:
                     json_str = response_text[json_start:json_end]
-                    result = json.loads(json_str)
+                    result = orjson.loads(json_str)
                     print(f"Successfully parsed JSON with {len(result.get('transactions', []))} transactions")
                     return result
                 else:
                     print("No valid JSON found in response")
                     return {"transactions": [], "confidence": 0.0}
-            except json.JSONDecodeError as e:
+            except orjson.JSONDecodeError as e:
                 print(f"JSON decode error: {e}")
                 print(f"Attempted to parse: {json_str[:200] if 'json_str' in locals() else 'N/A'}")
                 return {"transactions": [], "confidence": 0.0}
             
         except Exception as e:
-            print(f"Claude error: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("Claude error: %s", e)
             # エラー時でも詳細情報を返す
             return {"transactions": [], "confidence": 0.0, "error": str(e), "error_type": "claude_api_error"}
 
-    async def _gpt4v_extract(self, image_data: bytes) -> Dict[str, Any]:
-        base64_image = base64.b64encode(image_data).decode('utf-8')
-        
+    async def _gpt4v_extract(self, base64_image: str, media_type: str) -> Dict[str, Any]:
         try:
-            # 画像の種類を判定してメディアタイプを設定
-            if base64_image.startswith('/9j/'):  # JPEG
-                media_type = "image/jpeg"
-            elif base64_image.startswith('iVBOR'):  # PNG
-                media_type = "image/png"
-            else:
-                media_type = "image/png"  # デフォルトはPNG
-            
             response = await self.openai_client.chat.completions.create(
                 model="gpt-4o",  # 最新のGPT-4oモデルに更新
                 messages=[
@@ -459,77 +566,33 @@ class DualLLMProcessor:
                     }
                 ],
                 max_tokens=4000,  # より多くのトランザクションに対応
-                response_format={"type": "json_object"}  # JSON形式を強制
+                # スキーマに一致するJSONを強制
+                response_format={
+                    "type": "json_schema",
+                    "json_schema": {
+                        "name": "bank_statement_transactions",
+                        "strict": True,
+                        "schema": TRANSACTION_EXTRACTION_SCHEMA
+                    }
+                }
             )
             
             response_text = response.choices[0].message.content
             print(f"GPT-4V raw response (first 500 chars): {response_text[:500]}")
             
             try:
-                result = json.loads(response_text)
+                result = orjson.loads(response_text)
                 print(f"Successfully parsed GPT-4V JSON with {len(result.get('transactions', []))} transactions")
                 return result
-            except json.JSONDecodeError as e:
+            except orjson.JSONDecodeError as e:
                 print(f"GPT-4V JSON decode error: {e}")
                 return {"transactions": [], "confidence": 0.0}
             
         except Exception as e:
-            print(f"GPT-4V error: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("GPT-4V error: %s", e)
             # エラー時でも詳細情報を返す
             return {"transactions": [], "confidence": 0.0, "error": str(e), "error_type": "openai_api_error"}
 
-    async def _gpt4v_validate(self, image_data: bytes, claude_result: Dict[str, Any]) -> Dict[str, Any]:
-        base64_image = base64.b64encode(image_data).decode('utf-8')
-        
-        prompt = f"""
-        Claudeが抽出したデータの数値精度を検証してください：
-        {json.dumps(claude_result, ensure_ascii=False, indent=2)}
-
-        以下を確認：
-        - 金額の正確な読み取り
-        - 残高計算の検証
-        - 日付の正確性
-        
-        検証結果をJSON形式で返してください。
-        """
-
-        try:
-            # 画像の種類を判定してメディアタイプを設定
-            if base64_image.startswith('/9j/'):  # JPEG
-                media_type = "image/jpeg"
-            elif base64_image.startswith('iVBOR'):  # PNG
-                media_type = "image/png"
-            else:
-                media_type = "image/png"  # デフォルトはPNG
-            
-            response = await self.openai_client.chat.completions.create(
-                model="gpt-4o",  # 最新のGPT-4oモデルに更新
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {"type": "text", "text": prompt},
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:{media_type};base64,{base64_image}"
-                                }
-                            }
-                        ]
-                    }
-                ],
-                max_tokens=1500
-            )
-            
-            result = json.loads(response.choices[0].message.content)
-            return result
-            
-        except Exception as e:
-            print(f"GPT-4V validation error: {str(e)}")
-            return {"validation": "failed", "confidence": 0.5, "error": str(e), "error_type": "validation_error"}
-
     def _merge_results(self, claude_result: Dict[str, Any], gpt4v_result: Dict[str, Any], method: str) -> ProcessingResult:
         claude_confidence = claude_result.get("confidence", 0.0)
         gpt4v_confidence = gpt4v_result.get("confidence", 0.0)
@@ -610,7 +673,6 @@ class DualLLMProcessor:
 
     def _create_mock_result(self) -> ProcessingResult:
         """デモ用のモックデータを生成（動的列テスト用）"""
-        from models.transaction import TransactionData
         
         # 動的列を含むモックデータ生成のため、辞書形式で作成
         mock_transactions_dict = [
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# backend直下のパッケージ（services, modelsなど）をインポートできるようにする
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
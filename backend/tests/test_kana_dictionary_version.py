@@ -0,0 +1,42 @@
+import pytest
+
+from services.learning_service import KanaConverter
+
+
+class FakeStatement:
+    def __init__(self, conn):
+        self.conn = conn
+
+    async def fetchrow(self):
+        return self.conn.version
+
+
+class FakeConnection:
+    """辞書テーブルのバージョンだけを返す接続"""
+
+    def __init__(self, version):
+        self.version = version
+
+    async def prepared(self, sql):
+        return FakeStatement(self)
+
+
+@pytest.mark.asyncio
+async def test_refresh_dictionary_drops_cache_only_when_version_changes():
+    converter = KanaConverter(db_pool=None)
+    conn = FakeConnection((10, '2024-01-01 00:00:00'))
+
+    assert await converter.refresh_dictionary(conn)
+    converter._store_cache(('ｱ', None), 'ア')
+    converter._dictionary = ({}, None, {})
+
+    # 同じバージョンなら読み込み済みの辞書と変換結果を使い続ける
+    assert not await converter.refresh_dictionary(conn)
+    assert converter._cache
+    assert converter._dictionary is not None
+
+    # 他のプロセスで辞書が更新された場合は破棄する
+    conn.version = (11, '2024-01-02 00:00:00')
+    assert await converter.refresh_dictionary(conn)
+    assert not converter._cache
+    assert converter._dictionary is None
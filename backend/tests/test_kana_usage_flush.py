@@ -0,0 +1,47 @@
+import asyncio
+from collections import Counter
+from contextlib import asynccontextmanager
+
+import pytest
+
+from services.learning_service import KanaConverter
+
+
+class FakePool:
+    """executemanyの呼び出しを記録するだけのプール"""
+
+    def __init__(self):
+        self.calls = []
+
+    @asynccontextmanager
+    async def acquire(self):
+        yield self
+
+    async def executemany(self, sql, args):
+        self.calls.append(sorted(args))
+
+
+@pytest.mark.asyncio
+async def test_deferred_usage_counts_are_merged_into_one_write():
+    pool = FakePool()
+    converter = KanaConverter(pool)
+    converter.USAGE_FLUSH_INTERVAL = 0.01
+
+    converter.defer_usage_counts(Counter({'ｱ': 2}))
+    converter.defer_usage_counts(Counter({'ｱ': 1, 'ｲ': 1}))
+    await asyncio.sleep(0.05)
+
+    assert pool.calls == [[('ｱ', 3), ('ｲ', 1)]]
+
+
+@pytest.mark.asyncio
+async def test_close_flushes_pending_usage_counts():
+    pool = FakePool()
+    converter = KanaConverter(pool)
+    converter.USAGE_FLUSH_INTERVAL = 60
+
+    converter.defer_usage_counts(Counter({'ｱ': 1}))
+    await converter.close()
+
+    assert pool.calls == [[('ｱ', 1)]]
+    assert converter._usage_task is None
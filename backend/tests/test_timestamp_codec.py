@@ -0,0 +1,29 @@
+"""timestampテキストコーデックのテスト"""
+import re
+
+import pytest
+
+from services.database import _decode_timestamp, _encode_timestamp
+
+
+@pytest.mark.parametrize("pg_text, expected", [
+    # PostgreSQLは小数秒の末尾の0を省略して返す
+    ("2024-05-01 10:00:00.1234", "2024-05-01T10:00:00.123400"),
+    ("2024-05-01 10:00:00.5", "2024-05-01T10:00:00.500000"),
+    ("2024-05-01 10:00:00.123456", "2024-05-01T10:00:00.123456"),
+    ("2024-05-01 10:00:00", "2024-05-01T10:00:00"),
+])
+def test_decode_timestamp_pads_fraction_to_six_digits(pg_text, expected):
+    assert _decode_timestamp(pg_text) == expected
+
+
+def test_decoded_timestamp_is_parseable_by_strict_fromisoformat():
+    # Python 3.10のdatetime.fromisoformatは小数秒が3桁または6桁の場合のみ受け付ける
+    decoded = _decode_timestamp("2024-05-01 10:00:00.1234")
+    assert re.fullmatch(r"\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(\.\d{3}|\.\d{6})?", decoded)
+
+
+def test_history_cursor_round_trip():
+    # /historyのnext_cursorとして返した値をそのまま次ページの検索条件に使えること
+    decoded = _decode_timestamp("2024-05-01 10:00:00.5")
+    assert _encode_timestamp(decoded) == decoded
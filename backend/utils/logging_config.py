@@ -0,0 +1,31 @@
+"""
+ロギング設定ユーティリティ
+リクエスト処理中のログ出力をキュー経由でバックグラウンドスレッドに任せる
+"""
+import logging
+import logging.handlers
+import os
+import queue
+
+LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+
+def setup_logging() -> logging.handlers.QueueListener:
+    """ルートロガーにQueueHandlerを設定し、出力用のQueueListenerを開始して返す
+
+    ログレベルは環境変数LOG_LEVEL（既定: INFO）で指定する
+    """
+    log_queue = queue.SimpleQueue()
+
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+
+    root = logging.getLogger()
+    root.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+
+    listener = logging.handlers.QueueListener(
+        log_queue, stream_handler, respect_handler_level=True
+    )
+    listener.start()
+    return listener
@@ -2,42 +2,75 @@
 テキスト正規化ユーティリティ
 半角カタカナを全角カタカナに変換する処理を提供
 """
+import re
 import unicodedata
+from functools import lru_cache
+from typing import Dict
+
+
+def _compile_replacements(replacements: Dict[str, str]) -> re.Pattern:
+    """置換辞書のキーを長い順の選択肢にした正規表現を作成（1回の走査で最長一致を置換）"""
+    return re.compile('|'.join(
+        re.escape(key) for key in sorted(replacements, key=len, reverse=True)
+    ))
 
 
 class TextNormalizer:
     """テキスト正規化クラス"""
     
+    # 特定の文字の追加変換マップ（OCRで認識しにくい文字の対応）
+    KATAKANA_MAP = {
+        'ｱｿｼｴｰｼｮﾝ': 'アソシエーション',
+        'ﾓﾉﾀﾛｰ': 'モノタロー',
+        'ﾗｲﾌ': 'ライフ',
+        'ｸﾚｼﾞｯﾄ': 'クレジット',
+        'ﾋﾞｻﾞ': 'ビザ',
+        'ｾﾌﾞﾝ': 'セブン',
+        'ﾀｲﾑｽﾞｶｰ': 'タイムズカー',
+        'ﾁｸﾎｳ': 'チクホウ',
+        'ﾕｱｰｽﾞ': 'ユアーズ',
+        'ｽﾏｯｸ': 'スマック',
+        'ﾃｸﾎﾟｳ': 'テクポウ',
+        'ｱｹﾞ': 'アゲ'
+    }
+    
+    # 一般的な銀行用語の統一
+    BANK_TERM_MAP = {
+        'ｸﾚｼﾞｯﾄｶｰﾄﾞ': 'クレジットカード',
+        'ﾃﾞﾋﾞｯﾄ': 'デビット',
+        'ﾌﾘｺﾐ': '振込',
+        'ﾌﾘｺﾐﾃｽｳﾘｮｳ': '振込手数料',
+        'ｿｳｺﾞｳﾌﾘｺﾐ': '総合振込',
+        'ｹﾝｺｳﾎｹﾝ': '健康保険',
+        'ｲﾘｮｳﾎｹﾝ': '医療保険',
+        'ｼｬｶｲﾎｹﾝ': '社会保険',
+        'ｱｲﾃｨｰｴﾑ': 'ATM',
+        'ﾘﾖｳﾃｽｳﾘｮｳ': '利用手数料'
+    }
+    
+    _KATAKANA_PATTERN = _compile_replacements(KATAKANA_MAP)
+    _BANK_TERM_PATTERN = _compile_replacements(BANK_TERM_MAP)
+    
     @staticmethod
     def normalize_katakana(text: str) -> str:
         """半角カタカナを全角カタカナに変換"""
         if not text:
             return text
             
-        # 半角カタカナを全角カタカナに変換
-        normalized = unicodedata.normalize('NFKC', text)
-        
-        # 特定の文字の追加変換マップ（OCRで認識しにくい文字の対応）
-        char_map = {
-            'ｱｿｼｴｰｼｮﾝ': 'アソシエーション',
-            'ﾓﾉﾀﾛｰ': 'モノタロー',
-            'ﾗｲﾌ': 'ライフ',
-            'ｸﾚｼﾞｯﾄ': 'クレジット',
-            'ﾋﾞｻﾞ': 'ビザ',
-            'ｾﾌﾞﾝ': 'セブン',
-            'ﾀｲﾑｽﾞｶｰ': 'タイムズカー',
-            'ﾁｸﾎｳ': 'チクホウ',
-            'ﾕｱｰｽﾞ': 'ユアーズ',
-            'ｽﾏｯｸ': 'スマック',
-            'ﾃｸﾎﾟｳ': 'テクポウ',
-            'ｱｹﾞ': 'アゲ'
-        }
+        # ASCIIのみのテキストは変換対象の文字を含まない
+        if text.isascii():
+            return text
         
-        # 特定のパターンを変換
-        for half_kana, full_kana in char_map.items():
-            normalized = normalized.replace(half_kana, full_kana)
+        # 半角カタカナを全角カタカナに変換（既に正規化済みなら分解処理を省略）
+        if unicodedata.is_normalized('NFKC', text):
+            normalized = text
+        else:
+            normalized = unicodedata.normalize('NFKC', text)
         
-        return normalized
+        # 特定のパターンを1回の走査で変換
+        return TextNormalizer._KATAKANA_PATTERN.sub(
+            lambda m: TextNormalizer.KATAKANA_MAP[m.group(0)], normalized
+        )
     
     @staticmethod
     def normalize_bank_terms(text: str) -> str:
@@ -45,39 +78,34 @@ class TextNormalizer:
         if not text:
             return text
             
-        # 一般的な銀行用語の統一
-        term_map = {
-            'ｸﾚｼﾞｯﾄｶｰﾄﾞ': 'クレジットカード',
-            'ﾃﾞﾋﾞｯﾄ': 'デビット',
-            'ﾌﾘｺﾐ': '振込',
-            'ﾌﾘｺﾐﾃｽｳﾘｮｳ': '振込手数料',
-            'ｿｳｺﾞｳﾌﾘｺﾐ': '総合振込',
-            'ｹﾝｺｳﾎｹﾝ': '健康保険',
-            'ｲﾘｮｳﾎｹﾝ': '医療保険',
-            'ｼｬｶｲﾎｹﾝ': '社会保険',
-            'ｱｲﾃｨｰｴﾑ': 'ATM',
-            'ﾘﾖｳﾃｽｳﾘｮｳ': '利用手数料'
-        }
-        
-        normalized = text
-        for half_term, full_term in term_map.items():
-            normalized = normalized.replace(half_term, full_term)
+        if text.isascii():
+            return text
         
-        return normalized
+        # 銀行用語を1回の走査で変換（長い用語を優先）
+        return TextNormalizer._BANK_TERM_PATTERN.sub(
+            lambda m: TextNormalizer.BANK_TERM_MAP[m.group(0)], text
+        )
     
     @staticmethod
     def normalize_text(text: str) -> str:
-        """包括的なテキスト正規化"""
+        """包括的なテキスト正規化（同じ摘要が繰り返し現れるため結果をキャッシュ）"""
         if not text:
             return text
-            
-        # ステップ1: 半角カタカナを全角カタカナに変換
-        normalized = TextNormalizer.normalize_katakana(text)
         
-        # ステップ2: 銀行用語の正規化
-        normalized = TextNormalizer.normalize_bank_terms(normalized)
+        return TextNormalizer._normalize_cached(text)
+    
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def _normalize_cached(text: str) -> str:
+        """normalize_textの本体"""
+        # 半角カタカナを全角カタカナに変換（NFKC）
+        # 変換マップのキーはすべて半角カナのため、NFKC後のテキストには一致せず適用不要
+        if text.isascii() or unicodedata.is_normalized('NFKC', text):
+            normalized = text
+        else:
+            normalized = unicodedata.normalize('NFKC', text)
         
-        # ステップ3: 余分な空白を除去
+        # 余分な空白を除去
         normalized = ' '.join(normalized.split())
         
         return normalized
\ No newline at end of file
@@ -0,0 +1,6 @@
+-- アップロードファイルのハッシュ値（重複アップロード検出用）
+-- 003_processing_results_file_hash.sql
+
+ALTER TABLE processing_results ADD COLUMN IF NOT EXISTS file_hash VARCHAR(64);
+
+CREATE INDEX IF NOT EXISTS idx_processing_results_file_hash ON processing_results (file_hash);
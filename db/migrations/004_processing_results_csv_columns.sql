@@ -0,0 +1,4 @@
+-- CSV出力用の列構成（保存時に計算してダウンロード時の列検出を省略）
+-- 004_processing_results_csv_columns.sql
+
+ALTER TABLE processing_results ADD COLUMN IF NOT EXISTS csv_columns JSONB;
@@ -0,0 +1,15 @@
+-- 取引の並び順（取引編集時に行単位でupsertするためのキー）
+-- 005_transactions_row_ord.sql
+
+ALTER TABLE transactions ADD COLUMN IF NOT EXISTS row_ord INTEGER;
+
+-- 既存データは挿入順（id順）で採番
+UPDATE transactions t
+SET row_ord = o.row_ord
+FROM (
+    SELECT id, ROW_NUMBER() OVER (PARTITION BY processing_result_id ORDER BY id) AS row_ord
+    FROM transactions
+) o
+WHERE t.id = o.id AND t.row_ord IS NULL;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_transactions_result_row_ord ON transactions (processing_result_id, row_ord);
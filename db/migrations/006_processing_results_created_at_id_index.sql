@@ -0,0 +1,7 @@
+-- parallel-safe
+-- 履歴一覧のキーセットページング用の複合インデックス（一覧表示の列を含めてindex-only scanにする）
+-- 006_processing_results_created_at_id_index.sql
+
+CREATE INDEX IF NOT EXISTS idx_processing_results_created_at_id
+    ON processing_results (created_at DESC, id DESC)
+    INCLUDE (filename, status, confidence_score, processing_time, processing_method);
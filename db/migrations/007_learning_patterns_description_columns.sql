@@ -0,0 +1,6 @@
+-- parallel-safe
+-- 摘要パターンの修正前/修正後の文字列（適用時にパターン全体を解析せずに済むよう専用列に保持）
+-- 007_learning_patterns_description_columns.sql
+
+ALTER TABLE learning_patterns ADD COLUMN IF NOT EXISTS original_desc TEXT;
+ALTER TABLE learning_patterns ADD COLUMN IF NOT EXISTS corrected_desc TEXT;
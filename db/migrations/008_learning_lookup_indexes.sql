@@ -0,0 +1,9 @@
+-- parallel-safe
+-- 学習パターン読込（摘要・信頼度0.6超を頻度順）とカナ辞書の完全一致検索用のインデックス
+-- 008_learning_lookup_indexes.sql
+
+CREATE INDEX IF NOT EXISTS idx_pattern_type_frequency_hot
+    ON learning_patterns (pattern_type, frequency DESC)
+    WHERE confidence_score > 0.6;
+
+CREATE INDEX IF NOT EXISTS idx_kana_lookup ON kana_dictionary (kana_text, bank_specific);
@@ -0,0 +1,32 @@
+-- 学習パターンの一意キー（パターン更新を INSERT ... ON CONFLICT で1文にするため）
+-- 009_learning_patterns_unique_key.sql
+
+-- 同時実行で重複登録されたパターンは頻度を合算して1行にまとめる
+WITH ranked AS (
+    SELECT id,
+           ROW_NUMBER() OVER w AS rn,
+           COUNT(*) OVER w AS duplicate_count,
+           SUM(frequency) OVER w AS total_frequency,
+           MAX(confidence_score) OVER w AS max_confidence,
+           MAX(last_used) OVER w AS max_last_used
+    FROM learning_patterns
+    WINDOW w AS (
+        PARTITION BY pattern_type, original_pattern, corrected_pattern
+        ORDER BY frequency DESC, created_at, id
+        ROWS BETWEEN UNBOUNDED PRECEDING AND UNBOUNDED FOLLOWING
+    )
+), removed AS (
+    DELETE FROM learning_patterns
+    WHERE id IN (SELECT id FROM ranked WHERE rn > 1)
+)
+UPDATE learning_patterns lp
+SET frequency = r.total_frequency,
+    confidence_score = r.max_confidence,
+    last_used = r.max_last_used,
+    updated_at = CURRENT_TIMESTAMP
+FROM ranked r
+WHERE lp.id = r.id AND r.rn = 1 AND r.duplicate_count > 1;
+
+-- パターン本文は長くなり得るためハッシュ値で一意性を保証
+CREATE UNIQUE INDEX IF NOT EXISTS uk_learning_pattern
+    ON learning_patterns (pattern_type, md5(original_pattern), md5(corrected_pattern));
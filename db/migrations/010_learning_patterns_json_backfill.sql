@@ -0,0 +1,177 @@
+-- 旧形式（Pythonのstr(dict)）で保存された学習パターンをjson.dumps形式に書き換え、摘要の専用列を埋める
+-- 010_learning_patterns_json_backfill.sql
+
+-- Pythonのリテラル表記をjson.dumps(ensure_ascii=False)と同じ書式のJSONテキストに変換（変換できない場合はNULL）
+CREATE OR REPLACE FUNCTION pg_temp.py_literal_to_json(src TEXT) RETURNS TEXT AS $$
+DECLARE
+    i INTEGER := 1;
+    n INTEGER := length(src);
+    c TEXT;
+    quote_char TEXT;
+    esc TEXT;
+    buf TEXT;
+    token TEXT;
+    result TEXT := '';
+BEGIN
+    WHILE i <= n LOOP
+        c := substr(src, i, 1);
+        IF c = '''' OR c = '"' THEN
+            -- 文字列リテラル（エスケープを解釈してJSON文字列として出力）
+            quote_char := c;
+            buf := '';
+            i := i + 1;
+            LOOP
+                IF i > n THEN
+                    RETURN NULL;
+                END IF;
+                c := substr(src, i, 1);
+                IF c = quote_char THEN
+                    i := i + 1;
+                    EXIT;
+                ELSIF c = E'\\' THEN
+                    esc := substr(src, i + 1, 1);
+                    IF esc = 'n' THEN
+                        buf := buf || E'\n';
+                        i := i + 2;
+                    ELSIF esc = 'r' THEN
+                        buf := buf || E'\r';
+                        i := i + 2;
+                    ELSIF esc = 't' THEN
+                        buf := buf || E'\t';
+                        i := i + 2;
+                    ELSIF esc IN (E'\\', '''', '"') THEN
+                        buf := buf || esc;
+                        i := i + 2;
+                    ELSIF esc = 'x' THEN
+                        buf := buf || chr(('x' || lpad(substr(src, i + 2, 2), 8, '0'))::BIT(32)::INTEGER);
+                        i := i + 4;
+                    ELSIF esc = 'u' THEN
+                        buf := buf || chr(('x' || lpad(substr(src, i + 2, 4), 8, '0'))::BIT(32)::INTEGER);
+                        i := i + 6;
+                    ELSIF esc = 'U' THEN
+                        buf := buf || chr(('x' || substr(src, i + 2, 8))::BIT(32)::INTEGER);
+                        i := i + 10;
+                    ELSE
+                        RETURN NULL;
+                    END IF;
+                ELSE
+                    buf := buf || c;
+                    i := i + 1;
+                END IF;
+            END LOOP;
+            result := result || to_json(buf)::TEXT;
+        ELSIF c = ' ' THEN
+            i := i + 1;
+        ELSIF c = ':' THEN
+            result := result || ': ';
+            i := i + 1;
+        ELSIF c = ',' THEN
+            result := result || ', ';
+            i := i + 1;
+        ELSIF c IN ('{', '}', '[', ']') THEN
+            result := result || c;
+            i := i + 1;
+        ELSIF substr(src, i, 4) = 'None' THEN
+            result := result || 'null';
+            i := i + 4;
+        ELSIF substr(src, i, 4) = 'True' THEN
+            result := result || 'true';
+            i := i + 4;
+        ELSIF substr(src, i, 5) = 'False' THEN
+            result := result || 'false';
+            i := i + 5;
+        ELSE
+            -- 数値（書式はjson.dumpsと同じ）
+            token := substring(substr(src, i) FROM '^-?[0-9][0-9.eE+-]*');
+            IF token IS NULL THEN
+                RETURN NULL;
+            END IF;
+            result := result || token;
+            i := i + length(token);
+        END IF;
+    END LOOP;
+
+    -- 正しいJSONにならなかった場合は変換しない
+    PERFORM result::JSONB;
+    RETURN result;
+EXCEPTION WHEN OTHERS THEN
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql IMMUTABLE;
+
+CREATE TEMP TABLE learning_pattern_json ON COMMIT DROP AS
+SELECT id, pattern_type,
+       pg_temp.py_literal_to_json(original_pattern) AS original_json,
+       pg_temp.py_literal_to_json(corrected_pattern) AS corrected_json
+FROM learning_patterns
+WHERE original_desc IS NULL;
+
+-- 変換できない行と既にJSON形式の行は対象外
+DELETE FROM learning_pattern_json t
+USING learning_patterns lp
+WHERE lp.id = t.id
+  AND (t.original_json IS NULL OR t.corrected_json IS NULL
+       OR (t.original_json = lp.original_pattern AND t.corrected_json = lp.corrected_pattern));
+
+-- 移行後に記録された同じパターンの行がある場合は、旧形式の行の頻度を合算して旧形式の行を削除
+WITH legacy AS (
+    SELECT t.pattern_type, t.original_json, t.corrected_json,
+           SUM(COALESCE(lp.frequency, 1)) AS total_frequency,
+           MAX(lp.confidence_score) AS max_confidence,
+           MAX(lp.last_used) AS max_last_used
+    FROM learning_pattern_json t
+    JOIN learning_patterns lp ON lp.id = t.id
+    GROUP BY t.pattern_type, t.original_json, t.corrected_json
+)
+UPDATE learning_patterns lp
+SET frequency = COALESCE(lp.frequency, 1) + legacy.total_frequency,
+    confidence_score = GREATEST(lp.confidence_score, legacy.max_confidence),
+    last_used = GREATEST(lp.last_used, legacy.max_last_used),
+    updated_at = CURRENT_TIMESTAMP
+FROM legacy
+WHERE lp.pattern_type = legacy.pattern_type
+  AND lp.original_pattern = legacy.original_json
+  AND lp.corrected_pattern = legacy.corrected_json;
+
+DELETE FROM learning_patterns lp
+USING learning_pattern_json t, learning_patterns current_row
+WHERE lp.id = t.id
+  AND current_row.pattern_type = t.pattern_type
+  AND current_row.original_pattern = t.original_json
+  AND current_row.corrected_pattern = t.corrected_json;
+
+-- 残りの旧形式の行は変換後に同じになる行どうしを1行にまとめてからJSON形式に書き換える
+WITH ranked AS (
+    SELECT t.id,
+           ROW_NUMBER() OVER w AS rn,
+           SUM(COALESCE(lp.frequency, 1)) OVER w AS total_frequency,
+           MAX(lp.confidence_score) OVER w AS max_confidence,
+           MAX(lp.last_used) OVER w AS max_last_used
+    FROM learning_pattern_json t
+    JOIN learning_patterns lp ON lp.id = t.id
+    WINDOW w AS (
+        PARTITION BY t.pattern_type, t.original_json, t.corrected_json
+        ORDER BY lp.frequency DESC, lp.created_at, lp.id
+        ROWS BETWEEN UNBOUNDED PRECEDING AND UNBOUNDED FOLLOWING
+    )
+), removed AS (
+    DELETE FROM learning_patterns
+    WHERE id IN (SELECT id FROM ranked WHERE rn > 1)
+)
+UPDATE learning_patterns lp
+SET original_pattern = t.original_json,
+    corrected_pattern = t.corrected_json,
+    frequency = r.total_frequency,
+    confidence_score = r.max_confidence,
+    last_used = r.max_last_used,
+    updated_at = CURRENT_TIMESTAMP
+FROM ranked r
+JOIN learning_pattern_json t ON t.id = r.id
+WHERE lp.id = r.id AND r.rn = 1;
+
+-- 摘要パターンの専用列を埋める（適用時はこの列のみを参照する）
+UPDATE learning_patterns lp
+SET original_desc = lp.original_pattern::JSONB ->> 'description',
+    corrected_desc = lp.corrected_pattern::JSONB ->> 'description'
+FROM learning_pattern_json t
+WHERE lp.id = t.id AND lp.pattern_type = 'description';
@@ -8,7 +8,7 @@ import HistoryList from './components/HistoryList';
 import FileUploaderWithProgress from './components/FileUploaderWithProgress';
 import DataViewerEnhanced from './components/DataViewerEnhanced';
 import { ProcessingResult } from './types/transaction';
-import { getHistory, getResult, HistoryItem } from './services/api';
+import { getHistory, getHistoryStats, getResult, HistoryItem, HistoryStats } from './services/api';
 
 const theme = createTheme({
   palette: {
@@ -112,13 +112,18 @@ const EditPage: React.FC<{ fileId: string }> = ({ fileId }) => {
 // メインアプリケーションコンポーネント
 const AppContent: React.FC = () => {
   const [history, setHistory] = React.useState<HistoryItem[]>([]);
+  const [stats, setStats] = React.useState<HistoryStats | null>(null);
+  const [nextCursor, setNextCursor] = React.useState<string | null>(null);
   const [loading, setLoading] = React.useState(true);
+  const [loadingMore, setLoadingMore] = React.useState(false);
 
   React.useEffect(() => {
     const fetchHistory = async () => {
       try {
-        const data = await getHistory();
-        setHistory(data);
+        const [page, historyStats] = await Promise.all([getHistory(), getHistoryStats()]);
+        setHistory(page.history);
+        setNextCursor(page.next_cursor);
+        setStats(historyStats);
       } catch (error) {
         console.error('History fetch error:', error);
       } finally {
@@ -129,6 +134,21 @@ const AppContent: React.FC = () => {
     fetchHistory();
   }, []);
 
+  // 履歴の次ページを読み込む
+  const loadMoreHistory = async () => {
+    if (!nextCursor || loadingMore) return;
+    setLoadingMore(true);
+    try {
+      const page = await getHistory(nextCursor);
+      setHistory(prev => [...prev, ...page.history]);
+      setNextCursor(page.next_cursor);
+    } catch (error) {
+      console.error('History fetch error:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   if (loading) {
     return (
       <Container maxWidth="lg">
@@ -141,9 +161,16 @@ const AppContent: React.FC = () => {
 
   return (
     <Routes>
-      <Route path="/" element={<Dashboard history={history} />} />
+      <Route path="/" element={<Dashboard history={history} stats={stats} />} />
       <Route path="/upload" element={<UploadPage />} />
-      <Route path="/history" element={<HistoryList history={history} />} />
+      <Route path="/history" element={
+        <HistoryList
+          history={history}
+          hasMore={nextCursor !== null}
+          loadingMore={loadingMore}
+          onLoadMore={loadMoreHistory}
+        />
+      } />
       <Route path="/edit/:fileId" element={
         <EditPageWrapper />
       } />
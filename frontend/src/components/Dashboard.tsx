@@ -20,6 +20,7 @@ import {
   Schedule as ScheduleIcon
 } from '@mui/icons-material';
 import { useNavigate } from 'react-router-dom';
+import { HistoryStats } from '../services/api';
 
 interface HistoryItem {
   id: string;
@@ -32,17 +33,16 @@ interface HistoryItem {
 
 interface DashboardProps {
   history: HistoryItem[];
+  stats: HistoryStats | null;
 }
 
-const Dashboard: React.FC<DashboardProps> = ({ history }) => {
+const Dashboard: React.FC<DashboardProps> = ({ history, stats }) => {
   const navigate = useNavigate();
 
-  // 統計計算
-  const totalFiles = history.length;
-  const totalTransactions = history.reduce((sum, item) => sum + item.transaction_count, 0);
-  const averageConfidence = history.length > 0 
-    ? history.reduce((sum, item) => sum + item.confidence_score, 0) / history.length 
-    : 0;
+  // 統計は全履歴を対象にサーバー側で集計した値を使う（historyは先頭ページのみ）
+  const totalFiles = stats?.total_files ?? 0;
+  const totalTransactions = stats?.total_transactions ?? 0;
+  const averageConfidence = stats?.average_confidence ?? 0;
   
   const recentHistory = history.slice(0, 5);
 
@@ -53,40 +53,44 @@ const FileUploaderWithProgress: React.FC<FileUploaderWithProgressProps> = ({
     
     ws.onmessage = (event) => {
       try {
-        const data = JSON.parse(event.data);
-        if (data.type === 'progress') {
-          // 進捗メッセージを追加
-          const newMessage: ProgressMessage = {
-            id: `msg-${Date.now()}`,
-            message: data.message,
-            status: 'processing',
-            timestamp: new Date()
-          };
+        // バックエンドは連続した進捗をJSON配列にまとめて送信することがある
+        const parsed = JSON.parse(event.data);
+        const messages = Array.isArray(parsed) ? parsed : [parsed];
+        messages.forEach((data, index) => {
+          if (data.type === 'progress') {
+            // 進捗メッセージを追加
+            const newMessage: ProgressMessage = {
+              id: `msg-${Date.now()}-${index}`,
+              message: data.message,
+              status: 'processing',
+              timestamp: new Date()
+            };
           
-          setProgressMessages(prev => {
-            // 前のメッセージを完了状態に
-            const updated = prev.map(msg => ({
-              ...msg,
-              status: 'completed' as const
-            }));
-            return [...updated, newMessage];
-          });
+            setProgressMessages(prev => {
+              // 前のメッセージを完了状態に
+              const updated = prev.map(msg => ({
+                ...msg,
+                status: 'completed' as const
+              }));
+              return [...updated, newMessage];
+            });
           
-          // バックエンドから送信された進捗率を使用
-          if (data.progress !== undefined) {
-            setProgress(data.progress);
-          } else {
-            // フォールバック: 従来の推定計算
-            if (data.message.includes('page')) {
-              const match = data.message.match(/(\d+)\/(\d+)/);
-              if (match) {
-                const current = parseInt(match[1]);
-                const total = parseInt(match[2]);
-                setProgress(10 + (current / total) * 80);
+            // バックエンドから送信された進捗率を使用
+            if (data.progress !== undefined) {
+              setProgress(data.progress);
+            } else {
+              // フォールバック: 従来の推定計算
+              if (data.message.includes('page')) {
+                const match = data.message.match(/(\d+)\/(\d+)/);
+                if (match) {
+                  const current = parseInt(match[1]);
+                  const total = parseInt(match[2]);
+                  setProgress(10 + (current / total) * 80);
+                }
               }
             }
           }
-        }
+        });
       } catch (err) {
         console.error('WebSocket message error:', err);
       }
@@ -36,9 +36,12 @@ interface HistoryItem {
 
 interface HistoryListProps {
   history: HistoryItem[];
+  hasMore?: boolean;
+  loadingMore?: boolean;
+  onLoadMore?: () => void;
 }
 
-const HistoryList: React.FC<HistoryListProps> = ({ history }) => {
+const HistoryList: React.FC<HistoryListProps> = ({ history, hasMore = false, loadingMore = false, onLoadMore }) => {
   const navigate = useNavigate();
   const [searchTerm, setSearchTerm] = React.useState('');
 
@@ -199,6 +202,15 @@ const HistoryList: React.FC<HistoryListProps> = ({ history }) => {
           </TableBody>
         </Table>
       </TableContainer>
+
+      {/* 続きの履歴を読み込む */}
+      {hasMore && onLoadMore && (
+        <Box sx={{ textAlign: 'center', mt: 2 }}>
+          <Button variant="outlined" onClick={onLoadMore} disabled={loadingMore}>
+            {loadingMore ? '読み込み中...' : 'さらに読み込む'}
+          </Button>
+        </Box>
+      )}
     </Box>
   );
 };
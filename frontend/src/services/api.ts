@@ -111,7 +111,27 @@ export interface HistoryItem {
   status: string;
 }
 
-export const getHistory = async (): Promise<HistoryItem[]> => {
-  const response = await apiClient.get('/history');
-  return response.data.history;
+export interface HistoryPage {
+  history: HistoryItem[];
+  next_cursor: string | null;
+}
+
+// 履歴はページ単位で取得する（続きはnext_cursorを渡して必要な時に読み込む）
+export const getHistory = async (cursor?: string, limit: number = 50): Promise<HistoryPage> => {
+  const response = await apiClient.get<HistoryPage>('/history', {
+    params: { limit, cursor },
+  });
+  return response.data;
+};
+
+export interface HistoryStats {
+  total_files: number;
+  total_transactions: number;
+  average_confidence: number;
+}
+
+// ダッシュボードの集計値は全履歴を対象にサーバー側で算出する
+export const getHistoryStats = async (): Promise<HistoryStats> => {
+  const response = await apiClient.get<HistoryStats>('/history/stats');
+  return response.data;
 };
\ No newline at end of file
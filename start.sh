@@ -18,7 +18,7 @@ python run_migrations.py
 
 # Start FastAPI in background on a different internal port
 echo "Starting FastAPI server on port 8001..."
-uvicorn main:app --host 0.0.0.0 --port 8001 &
+uvicorn main:app --host 0.0.0.0 --port 8001 --loop uvloop --http httptools --ws websockets &
 FASTAPI_PID=$!
 echo "FastAPI started with PID: $FASTAPI_PID"
 
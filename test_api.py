@@ -22,14 +22,13 @@ async def test_openai():
     print(f"OpenAI APIキー: {api_key[:20]}...")
     
     try:
-        client = AsyncOpenAI(api_key=api_key)
-        
-        # 簡単なテストメッセージを送信
-        response = await client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[{"role": "user", "content": "Hello, this is a test. Reply with 'OK' only."}],
-            max_tokens=10
-        )
+        async with AsyncOpenAI(api_key=api_key) as client:
+            # 簡単なテストメッセージを送信
+            response = await client.chat.completions.create(
+                model="gpt-3.5-turbo",
+                messages=[{"role": "user", "content": "Hello, this is a test. Reply with 'OK' only."}],
+                max_tokens=10
+            )
         
         print(f"[OK] OpenAI API: 正常動作")
         print(f"   Response: {response.choices[0].message.content}")
@@ -50,14 +49,13 @@ async def test_anthropic():
     print(f"Anthropic APIキー: {api_key[:20]}...")
     
     try:
-        client = AsyncAnthropic(api_key=api_key)
-        
-        # 簡単なテストメッセージを送信
-        response = await client.messages.create(
-            model="claude-3-haiku-20240307",  # 最も安価なモデルでテスト
-            max_tokens=10,
-            messages=[{"role": "user", "content": "Hello, this is a test. Reply with 'OK' only."}]
-        )
+        async with AsyncAnthropic(api_key=api_key) as client:
+            # 簡単なテストメッセージを送信
+            response = await client.messages.create(
+                model="claude-3-haiku-20240307",  # 最も安価なモデルでテスト
+                max_tokens=10,
+                messages=[{"role": "user", "content": "Hello, this is a test. Reply with 'OK' only."}]
+            )
         
         print(f"[OK] Anthropic API: 正常動作")
         print(f"   Response: {response.content[0].text}")
@@ -76,10 +74,8 @@ async def main():
     print("=" * 60)
     print()
     
-    # 両方のAPIをテスト
-    openai_ok = await test_openai()
-    print()
-    anthropic_ok = await test_anthropic()
+    # 両方のAPIを並行してテスト
+    openai_ok, anthropic_ok = await asyncio.gather(test_openai(), test_anthropic())
     
     print()
     print("=" * 60)
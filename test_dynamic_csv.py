@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 
 import csv
+import functools
 import io
 from urllib.parse import quote
 
@@ -56,69 +57,89 @@ mock_transactions = [
     }
 ]
 
-def generate_dynamic_csv(transactions):
-    """Generate CSV with dynamic columns similar to our backend implementation"""
-    output = io.StringIO()
-    writer = csv.writer(output, quoting=csv.QUOTE_ALL)
+# Basic columns in preferred order
+BASIC_COLUMNS = ("date", "description", "withdrawal", "deposit", "balance")
+NUMERIC_COLUMNS = frozenset({"withdrawal", "deposit", "balance"})
+EXCLUDED_COLUMNS = frozenset({"confidence_score"})
+
+# Basic columns plus excluded ones; everything else is a dynamic column
+NON_DYNAMIC_COLUMNS = frozenset(BASIC_COLUMNS) | EXCLUDED_COLUMNS
+
+# Header mapping to Japanese
+HEADER_MAP = {
+    "date": "日付",
+    "description": "摘要",
+    "withdrawal": "出金",
+    "deposit": "入金",
+    "balance": "残高"
+}
+
+
+def _format_numeric(value):
+    """Integer-valued numbers are written without a trailing .0"""
+    if value is None or value == "":
+        return ""
+    try:
+        if isinstance(value, (int, float)) and value == int(value):
+            return str(int(value))
+    except (ValueError, TypeError):
+        pass
+    return str(value)
+
+
+def _format_text(value):
+    # csv.writer stringifies non-None values itself
+    return "" if value is None else value
+
+
+@functools.lru_cache(maxsize=16)
+def _column_plan(column_names):
+    """Derive column order, header line and formatters for a set of keys (memoized per schema)"""
+    # Include existing basic columns only
+    ordered_columns = [col for col in BASIC_COLUMNS if col in column_names]
     
-    if not transactions:
-        writer.writerow(["日付", "摘要", "出金", "入金", "残高"])
-        writer.writerow(["", "", "", "", ""])
-        return output.getvalue()
+    # Add additional dynamic columns in alphabetical order
+    additional_columns = sorted(column_names - NON_DYNAMIC_COLUMNS)
     
-    # Detect all unique columns dynamically
-    all_unique_columns = set()
-    for transaction in transactions:
-        if isinstance(transaction, dict):
-            all_unique_columns.update(transaction.keys())
+    all_columns = ordered_columns + additional_columns
     
-    # Basic columns in preferred order
-    basic_columns = ["date", "description", "withdrawal", "deposit", "balance"]
-    excluded_columns = {"confidence_score"}
+    header = io.StringIO()
+    csv.writer(header, quoting=csv.QUOTE_ALL).writerow([HEADER_MAP.get(col, col) for col in all_columns])
     
-    # Include existing basic columns only
-    ordered_columns = [col for col in basic_columns if col in all_unique_columns]
+    # Column formatters are resolved once, not per cell
+    columns = tuple((col, _format_numeric if col in NUMERIC_COLUMNS else _format_text) for col in all_columns)
+    return header.getvalue(), columns
+
+
+def generate_dynamic_csv(transactions, *, schema=None):
+    """Generate CSV with dynamic columns similar to our backend implementation
     
-    # Add additional dynamic columns in alphabetical order
-    additional_columns = sorted([col for col in all_unique_columns 
-                               if col not in basic_columns and col not in excluded_columns])
+    Callers that already know the set of transaction keys can pass it as
+    ``schema`` to skip column detection.
+    """
+    output = io.StringIO()
+    writer = csv.writer(output, quoting=csv.QUOTE_ALL)
     
-    all_columns = ordered_columns + additional_columns
+    if not transactions:
+        writer.writerow([HEADER_MAP[col] for col in BASIC_COLUMNS])
+        writer.writerow([""] * len(BASIC_COLUMNS))
+        return output.getvalue()
     
-    # Header mapping to Japanese
-    header_map = {
-        "date": "日付",
-        "description": "摘要", 
-        "withdrawal": "出金",
-        "deposit": "入金",
-        "balance": "残高"
-    }
-    headers = [header_map.get(col, col) for col in all_columns]
-    writer.writerow(headers)
+    if schema is None:
+        # Detect all unique columns dynamically (single C-level union over the dict keys)
+        schema = set().union(*[t for t in transactions if isinstance(t, dict)])
     
-    # Data rows
-    for transaction in transactions:
-        row = []
-        for col in all_columns:
-            value = transaction.get(col) if isinstance(transaction, dict) else getattr(transaction, col, None)
-            
-            # Numeric field processing
-            if col in ["withdrawal", "deposit", "balance"]:
-                if value is not None and value != "":
-                    try:
-                        formatted_value = str(int(value)) if isinstance(value, (int, float)) and value == int(value) else str(value)
-                        row.append(formatted_value)
-                    except (ValueError, TypeError):
-                        row.append(str(value) if value is not None else "")
-                else:
-                    row.append("")
-            else:
-                # Text field processing
-                row.append(str(value) if value is not None else "")
-        
-        writer.writerow(row)
+    header_line, columns = _column_plan(frozenset(schema))
+    output.write(header_line)
+    
+    # Data rows (written in a single writerows call)
+    writer.writerows(
+        [fmt(transaction.get(col)) for col, fmt in columns]
+        if isinstance(transaction, dict)
+        else [fmt(getattr(transaction, col, None)) for col, fmt in columns]
+        for transaction in transactions
+    )
     
-    output.seek(0)
     return output.getvalue()
 
 if __name__ == "__main__":
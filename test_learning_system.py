@@ -5,18 +5,26 @@ Learning System Integration Test Script
 """
 
 import asyncio
-import json
-import requests
+import httpx
+import orjson
 import uuid
 import re
 from datetime import datetime
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 
 BASE_URL = "http://localhost:8000"
 
+# サーバーへの同時リクエスト数の上限
+MAX_CONCURRENT_REQUESTS = 10
+
+# 半角カナ検出用
+HALF_WIDTH_KANA_PATTERN = re.compile(r'[ｦ-ﾟ]+')
+
 class LearningSystemTester:
     def __init__(self):
-        self.session = requests.Session()
+        # クライアントとセマフォはイベントループ上で生成する（run_all_tests内）
+        self.client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
         self.test_results = []
     
     def log_test(self, test_name: str, success: bool, details: str = ""):
@@ -25,7 +33,7 @@ class LearningSystemTester:
             "test_name": test_name,
             "success": success,
             "details": details,
-            "timestamp": datetime.now().isoformat()
+            "timestamp": datetime.now()
         }
         self.test_results.append(result)
         status = "PASS" if success else "FAIL"
@@ -33,13 +41,33 @@ class LearningSystemTester:
         if details:
             print(f"    {details}")
     
-    def test_kana_dictionary(self):
+    async def _request(self, method: str, path: str, **kwargs) -> httpx.Response:
+        """同時実行数を制限してリクエストを送信"""
+        async with self._semaphore:
+            return await self.client.request(method, path, **kwargs)
+    
+    async def _probe(self, test_name: str, method: str, path: str, success_details: str = "", **kwargs) -> Optional[httpx.Response]:
+        """ステータス200かどうかだけを確認するテスト（成功時はレスポンスを返す）"""
+        try:
+            response = await self._request(method, path, **kwargs)
+        except Exception as e:
+            self.log_test(test_name, False, str(e))
+            return None
+        
+        if response.status_code == 200:
+            self.log_test(test_name, True, success_details)
+            return response
+        
+        self.log_test(test_name, False, f"HTTP {response.status_code}: {response.text}")
+        return None
+    
+    async def test_kana_dictionary(self):
         """かな辞書のテスト"""
         try:
             # 辞書データ取得
-            response = self.session.get(f"{BASE_URL}/api/learning/kana-dictionary")
+            response = await self._request("GET", "/api/learning/kana-dictionary")
             if response.status_code == 200:
-                data = response.json()
+                data = orjson.loads(response.content)
                 self.log_test("Get Kana Dictionary", True, f"取得データ数: {len(data)}")
                 
                 # データの内容確認
@@ -57,50 +85,31 @@ class LearningSystemTester:
         except Exception as e:
             self.log_test("Get Kana Dictionary", False, str(e))
     
-    def test_correction_recording(self):
+    async def test_correction_recording(self):
         """修正記録のテスト"""
-        try:
-            # テスト用の修正データ
-            correction_data = {
-                "file_id": str(uuid.uuid4()),
-                "original_data": {"description": "ｽｰﾊﾟｰ", "amount": 1000},
-                "corrected_data": {"description": "スーパー", "amount": 1000},
-                "correction_type": "kana_correction"
-            }
-            
-            response = self.session.post(
-                f"{BASE_URL}/api/learning/corrections", 
-                json=correction_data
-            )
-            
-            if response.status_code == 200:
-                self.log_test("Record Correction", True, "修正データを正常に記録")
-            else:
-                self.log_test("Record Correction", False, f"HTTP {response.status_code}: {response.text}")
-                
-        except Exception as e:
-            self.log_test("Record Correction", False, str(e))
+        # テスト用の修正データ
+        correction_data = {
+            "file_id": str(uuid.uuid4()),
+            "original_data": {"description": "ｽｰﾊﾟｰ", "amount": 1000},
+            "corrected_data": {"description": "スーパー", "amount": 1000},
+            "correction_type": "kana_correction"
+        }
+        
+        await self._probe("Record Correction", "POST", "/api/learning/corrections",
+                          "修正データを正常に記録", json=correction_data)
     
-    def test_learning_patterns(self):
+    async def test_learning_patterns(self):
         """学習パターンのテスト"""
-        try:
-            response = self.session.get(f"{BASE_URL}/api/learning/patterns/analysis")
-            if response.status_code == 200:
-                data = response.json()
-                self.log_test("Get Learning Patterns", True, f"パターン分析結果を取得")
-            else:
-                self.log_test("Get Learning Patterns", False, f"HTTP {response.status_code}")
-                
-        except Exception as e:
-            self.log_test("Get Learning Patterns", False, str(e))
+        await self._probe("Get Learning Patterns", "GET", "/api/learning/patterns/analysis",
+                          "パターン分析結果を取得")
     
-    def test_column_mappings(self):
+    async def test_column_mappings(self):
         """カラムマッピングのテスト"""
         try:
             # GMOあおぞら銀行のマッピング取得
-            response = self.session.get(f"{BASE_URL}/api/learning/column-mappings/GMOあおぞら")
+            response = await self._request("GET", "/api/learning/column-mappings/GMOあおぞら")
             if response.status_code == 200:
-                data = response.json()
+                data = orjson.loads(response.content)
                 self.log_test("Get Column Mappings", True, f"GMOあおぞら銀行のマッピング数: {len(data)}")
                 
                 # マッピング保存のテスト
@@ -112,29 +121,21 @@ class LearningSystemTester:
                     ]
                 }
                 
-                save_response = self.session.post(
-                    f"{BASE_URL}/api/learning/column-mappings",
-                    json=test_mapping
-                )
+                await self._probe("Save Column Mappings", "POST", "/api/learning/column-mappings", "テストマッピングを保存", json=test_mapping)
                 
-                if save_response.status_code == 200:
-                    self.log_test("Save Column Mappings", True, "テストマッピングを保存")
-                else:
-                    self.log_test("Save Column Mappings", False, f"HTTP {save_response.status_code}")
-                    
             else:
                 self.log_test("Get Column Mappings", False, f"HTTP {response.status_code}")
                 
         except Exception as e:
             self.log_test("Column Mappings Test", False, str(e))
     
-    def test_export_presets(self):
+    async def test_export_presets(self):
         """エクスポートプリセットのテスト"""
         try:
             # プリセット取得
-            response = self.session.get(f"{BASE_URL}/api/learning/export-presets")
+            response = await self._request("GET", "/api/learning/export-presets")
             if response.status_code == 200:
-                data = response.json()
+                data = orjson.loads(response.content)
                 self.log_test("Get Export Presets", True, f"プリセット数: {len(data)}")
                 
                 # プリセット保存のテスト
@@ -149,23 +150,15 @@ class LearningSystemTester:
                     }
                 }
                 
-                save_response = self.session.post(
-                    f"{BASE_URL}/api/learning/export-presets",
-                    json=test_preset
-                )
+                await self._probe("Save Export Preset", "POST", "/api/learning/export-presets", "テストプリセットを保存", json=test_preset)
                 
-                if save_response.status_code == 200:
-                    self.log_test("Save Export Preset", True, "テストプリセットを保存")
-                else:
-                    self.log_test("Save Export Preset", False, f"HTTP {save_response.status_code}")
-                    
             else:
                 self.log_test("Get Export Presets", False, f"HTTP {response.status_code}")
                 
         except Exception as e:
             self.log_test("Export Presets Test", False, str(e))
     
-    def test_apply_learning(self):
+    async def test_apply_learning(self):
         """学習適用のテスト"""
         try:
             # テスト用のトランザクションデータ（正しい半角カナを使用）
@@ -189,15 +182,15 @@ class LearningSystemTester:
             # 半角カナが正しく含まれているかデバッグ
             for t in test_transactions:
                 desc = t["description"]
-                print(f"DEBUG: '{desc}' contains kana: {bool(re.search(r'[ｦ-ﾟ]+', desc))}")
+                print(f"DEBUG: '{desc}' contains kana: {bool(HALF_WIDTH_KANA_PATTERN.search(desc))}")
             
-            response = self.session.post(
-                f"{BASE_URL}/api/learning/apply-learning?bank_name=GMOあおぞら",
+            response = await self._request(
+                "POST", "/api/learning/apply-learning?bank_name=GMOあおぞら",
                 json=test_transactions
             )
             
             if response.status_code == 200:
-                corrected_data = response.json()
+                corrected_data = orjson.loads(response.content)
                 self.log_test("Apply Learning", True, f"学習適用結果: {len(corrected_data)}件")
                 
                 # 半角カナが修正されているかチェック
@@ -215,17 +208,28 @@ class LearningSystemTester:
         except Exception as e:
             self.log_test("Apply Learning", False, str(e))
     
-    def run_all_tests(self):
+    async def run_all_tests(self):
         """全テストを実行"""
         print("学習システム統合テスト開始")
         print("=" * 50)
         
-        self.test_kana_dictionary()
-        self.test_correction_recording()
-        self.test_learning_patterns()
-        self.test_column_mappings()
-        self.test_export_presets()
-        self.test_apply_learning()
+        self.client = httpx.AsyncClient(base_url=BASE_URL, timeout=30.0)
+        self._semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+        
+        # 取得系と学習適用のテストは互いに独立しているため並行実行する
+        # （GET→POSTの順序が必要なものは各テスト内で逐次実行）
+        # 修正記録は学習パターンを書き込み学習適用の結果に影響するため、その後に実行する
+        try:
+            await asyncio.gather(
+                self.test_kana_dictionary(),
+                self.test_learning_patterns(),
+                self.test_column_mappings(),
+                self.test_export_presets(),
+                self.test_apply_learning()
+            )
+            await self.test_correction_recording()
+        finally:
+            await self.client.aclose()
         
         print("\n" + "=" * 50)
         print("テスト結果サマリー")
@@ -249,11 +253,11 @@ class LearningSystemTester:
 
 if __name__ == "__main__":
     tester = LearningSystemTester()
-    success = tester.run_all_tests()
+    success = asyncio.run(tester.run_all_tests())
     
     # 結果をJSONファイルに保存
-    with open("test_results.json", "w", encoding="utf-8") as f:
-        json.dump(tester.test_results, f, ensure_ascii=False, indent=2)
+    with open("test_results.json", "wb") as f:
+        f.write(orjson.dumps(tester.test_results, option=orjson.OPT_INDENT_2))
     
     print(f"\n詳細な結果は test_results.json に保存されました")
     exit(0 if success else 1)
\ No newline at end of file
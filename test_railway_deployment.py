@@ -1,18 +1,39 @@
 #!/usr/bin/env python3
-import requests
-import json
+import asyncio
 import time
 
+import httpx
+import orjson
+
+async def _fetch_all(base_url, paths):
+    """Fetch all paths concurrently over one client; failures are returned as exceptions"""
+    async with httpx.AsyncClient(base_url=base_url, timeout=30) as client:
+        responses = await asyncio.gather(
+            *(client.get(path) for path in paths), return_exceptions=True
+        )
+    return dict(zip(paths, responses))
+
+
+def _unwrap(response):
+    if isinstance(response, Exception):
+        raise response
+    return response
+
+
 def test_railway_deployment(base_url):
     """Test Railway deployment endpoints"""
     print(f"Testing Railway deployment at: {base_url}")
     
+    # All probes are independent, so issue them at once and report in order.
+    # The root endpoint and the frontend check share the same GET /.
+    responses = asyncio.run(_fetch_all(base_url, ["/", "/health", "/history"]))
+    
     # Test 1: Root endpoint
     print("\n1. Testing root endpoint...")
     try:
-        response = requests.get(f"{base_url}/", timeout=30)
+        response = _unwrap(responses["/"])
         if response.status_code == 200:
-            print(f"✅ Root endpoint: {response.json()}")
+            print(f"✅ Root endpoint: {orjson.loads(response.content)}")
         else:
             print(f"❌ Root endpoint failed: {response.status_code}")
     except Exception as e:
@@ -21,9 +42,9 @@ def test_railway_deployment(base_url):
     # Test 2: Health check endpoint
     print("\n2. Testing health check endpoint...")
     try:
-        response = requests.get(f"{base_url}/health", timeout=30)
+        response = _unwrap(responses["/health"])
         if response.status_code == 200:
-            health_data = response.json()
+            health_data = orjson.loads(response.content)
             print(f"✅ Health check: {health_data}")
             
             if health_data.get('database') == 'connected':
@@ -38,9 +59,9 @@ def test_railway_deployment(base_url):
     # Test 3: History endpoint
     print("\n3. Testing history endpoint...")
     try:
-        response = requests.get(f"{base_url}/history", timeout=30)
+        response = _unwrap(responses["/history"])
         if response.status_code == 200:
-            history_data = response.json()
+            history_data = orjson.loads(response.content)
             print(f"✅ History endpoint: Found {len(history_data.get('history', []))} records")
         else:
             print(f"❌ History endpoint failed: {response.status_code}")
@@ -50,7 +71,7 @@ def test_railway_deployment(base_url):
     # Test 4: Static file serving (React frontend)
     print("\n4. Testing frontend static files...")
     try:
-        response = requests.get(base_url, timeout=30)
+        response = _unwrap(responses["/"])
         if response.status_code == 200 and 'text/html' in response.headers.get('content-type', ''):
             print("✅ Frontend is serving properly")
         else:
@@ -59,6 +80,13 @@ def test_railway_deployment(base_url):
         print(f"❌ Frontend serving error: {e}")
 
 if __name__ == "__main__":
+    # uvloop is installed with uvicorn[standard]; fall back to the stdlib loop otherwise
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
+    
     # Replace with your actual Railway deployment URL
     railway_url = "https://siwake-app-production.up.railway.app"  # Update with actual URL
     